@@ -1,6 +1,7 @@
 """Application configuration from environment variables."""
 import os
 from pathlib import Path
+from typing import Any
 
 from pydantic_settings import BaseSettings
 
@@ -18,6 +19,95 @@ class Settings(BaseSettings):
     openai_realtime_model: str = "gpt-4o-mini-realtime-preview"
     openai_realtime_voice: str = "alloy"
 
+    # Hedged analysis: if the primary call is still running after the deadline,
+    # race a second request (optionally on a fallback model) and keep the winner.
+    analysis_hedge_enabled: bool = False
+    analysis_hedge_deadline_ms: int = 4000
+    analysis_hedge_percentile: float = 0.9
+    analysis_hedge_min_samples: int = 20
+    analysis_hedge_fallback_model: str = ""
+
+    # Worker pools per workload class, so slow extractions cannot starve analysis.
+    interactive_pool_size: int = 8
+    background_pool_size: int = 2
+    vector_pool_size: int = 4
+
+    # Session snapshots (append-only log + checkpoint) so restarts resume active check-ins.
+    session_snapshot_enabled: bool = True
+    session_snapshot_interval_s: float = 2.0
+    session_checkpoint_every: int = 500
+    session_snapshot_max_age_h: float = 24.0
+    # Snapshot directory ("" = backend/session_data). Each API process needs its own; a second
+    # process finding the directory locked runs without snapshots.
+    session_snapshot_dir: str = ""
+
+    # How long a result is replayed for a repeated Idempotency-Key.
+    idempotency_ttl_s: float = 300.0
+
+    # Embedding backend for the vector store: "openai" or "hashing" (local, in-process, no network).
+    embedding_backend: str = "openai"
+    openai_embedding_model: str = "text-embedding-3-small"
+    hashing_embedding_dim: int = 1024
+
+    # Vector store client: "embedded" (PersistentClient on backend/chroma_data, one process) or
+    # "http" (a separately run Chroma server shared by every API worker).
+    chroma_mode: str = "embedded"
+    chroma_host: str = "localhost"
+    chroma_port: int = 8001
+    chroma_ssl: bool = False
+    chroma_auth_token: str = ""
+    # Only one worker per shared index should run retention; off on the others.
+    vector_maintenance_leader: bool = True
+
+    # Vector store: time-sharded collections ("none" | "day" | "week" | "month"), retention and compaction.
+    vector_shard_mode: str = "month"
+    vector_retention_days: float = 0
+    vector_retain_completed_sessions: bool = True
+    vector_compact_min_deletes: int = 1000
+    vector_maintenance_interval_s: float = 3600
+    # After each stored turn, one batched query refreshes similar turns for every unanswered
+    # question, so coverage checks and the analysis prompt read them from memory.
+    coverage_precompute_enabled: bool = True
+
+    # Strict JSON-schema outputs for analysis/extraction; compact drops `reason` and shortens keys.
+    structured_outputs_enabled: bool = True
+    analysis_compact_output: bool = False
+    # Fused mode: analysis also returns the extraction for final statuses, skipping the second call.
+    analysis_fused_extraction: bool = False
+    # End-of-session extraction: each question's full transcript once the check-in completes, via
+    # the exemplar / routed extraction path, reusing fused-analysis extractions; failed attempts
+    # retry after retry_s, doubling each time. Per-question extraction inside text-submit is off
+    # by default (it would pay for extraction twice and delay turns).
+    session_finalize_enabled: bool = True
+    session_finalize_max_attempts: int = 3
+    session_finalize_retry_s: float = 5.0
+    inline_extraction_enabled: bool = False
+
+    # Most recent LLM calls kept in the in-memory token usage ledger.
+    usage_ledger_max_records: int = 20000
+
+    # Survey registry: question sets loaded from backend/surveys/*.json; sessions default to this one.
+    default_survey_id: str = "training_impact"
+    # Pre-render spoken intros with TTS at startup (cached on disk under backend/survey_audio/).
+    survey_intro_audio_enabled: bool = True
+
+    # Few-shot extraction: nearest curated exemplars (scripts/build_exemplars.py) let a cheaper model extract.
+    extraction_exemplars_enabled: bool = False
+    extraction_exemplar_model: str = "gpt-4o-mini"
+    extraction_exemplar_k: int = 3
+
+    # Adaptive model routing. Rules are tried in order; the first whose bounds all hold picks the
+    # model ("" = the endpoint's configured model) and max_tokens. Bounds: min_/max_words,
+    # min_/max_specificity, min_/max_follow_ups, has_coverage. Set as JSON lists in the env.
+    model_routing_enabled: bool = False
+    analysis_routing_rules: list[dict[str, Any]] = [
+        {"name": "minimal", "max_words": 4, "max_tokens": 250},
+        {"name": "short", "max_words": 40, "max_tokens": 400},
+    ]
+    extraction_routing_rules: list[dict[str, Any]] = [
+        {"name": "short", "max_words": 30, "model": "gpt-4o-mini", "max_tokens": 300},
+    ]
+
     class Config:
         env_file = str(ENV_PATH)
         env_file_encoding = "utf-8"
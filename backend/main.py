@@ -1,11 +1,27 @@
 """InnovateUS Impact Check-In — FastAPI backend."""
+import asyncio
 import logging
+import time
+
+_import_started = time.perf_counter()
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config import settings, ENV_PATH
 from routers import checkin, realtime
+from services.executors import pool_stats
+from services import exemplars, idempotency, model_router, session_store, survey_registry, usage_ledger, vector_store
+from services.session_manager import (
+    get_coverage_stats,
+    get_finalize_stats,
+    get_hedge_stats,
+    restore_sessions,
+    start_vector_maintenance,
+)
+from services.warmup import get_startup_report, record_phase, warm_up
+
+record_phase("app_import", time.perf_counter() - _import_started)
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
 logger = logging.getLogger(__name__)
@@ -43,9 +59,47 @@ def startup_diagnostics():
     logger.info("Models: vagueness=%s, extraction=%s, whisper=%s, tts=%s (%s)",
                 settings.openai_vagueness_model, settings.openai_extraction_model,
                 settings.openai_whisper_model, settings.openai_tts_model, settings.openai_tts_voice)
+    if settings.analysis_hedge_enabled:
+        logger.info("Analysis hedging: ON (deadline=%dms until %d samples, then p%d; fallback=%s)",
+                    settings.analysis_hedge_deadline_ms, settings.analysis_hedge_min_samples,
+                    int(settings.analysis_hedge_percentile * 100),
+                    settings.analysis_hedge_fallback_model or settings.openai_vagueness_model)
     logger.info("=" * 50)
 
 
+@app.on_event("startup")
+def load_surveys():
+    # Compile survey prompts before restored sessions or requests need them.
+    start = time.perf_counter()
+    survey_registry.load_surveys()
+    record_phase("survey_registry", time.perf_counter() - start)
+
+
+@app.on_event("startup")
+def restore_session_snapshots():
+    start = time.perf_counter()
+    restore_sessions()
+    record_phase("session_restore", time.perf_counter() - start)
+    start_vector_maintenance()
+
+
+_warmup_task: asyncio.Task | None = None
+
+
+@app.on_event("startup")
+async def start_warmup():
+    # Warm Chroma, HTTP clients and question embeddings without delaying startup.
+    global _warmup_task
+    _warmup_task = asyncio.create_task(warm_up())
+
+
+@app.on_event("shutdown")
+async def close_clients():
+    await realtime.close_http_client()
+    session_store.stop()
+    vector_store.stop_maintenance()
+
+
 @app.get("/")
 def root():
     return {"app": "InnovateUS Impact Check-In", "status": "ok"}
@@ -54,8 +108,43 @@ def root():
 @app.get("/api/health")
 def health():
     key = settings.openai_api_key.strip().strip('"').strip("'")
+    startup = get_startup_report()
     return {
         "status": "healthy",
+        "ready": startup["ready"],
         "api_key_configured": bool(key),
         "env_path": str(ENV_PATH),
+        "startup": startup,
+    }
+
+
+@app.get("/api/metrics")
+def metrics():
+    return {
+        "analysis_hedging": get_hedge_stats(),
+        "executors": pool_stats(),
+        "session_snapshots": session_store.get_stats(),
+        "idempotency": idempotency.get_stats(),
+        "vector_store": vector_store.get_stats(),
+        "coverage_precompute": get_coverage_stats(),
+        "extraction_exemplars": exemplars.get_stats(),
+        "model_routing": model_router.get_stats(),
+        "session_finalization": get_finalize_stats(),
     }
+
+
+@app.get("/api/metrics/usage")
+def usage_summary(group_by: str = "model,endpoint", since: float | None = None):
+    keys = tuple(k.strip() for k in group_by.split(",") if k.strip() in ("model", "endpoint", "session_id"))
+    return usage_ledger.summary(group_by=keys or ("model", "endpoint"), since=since)
+
+
+@app.get("/api/metrics/usage/records")
+def usage_records(
+    session_id: str | None = None,
+    endpoint: str | None = None,
+    model: str | None = None,
+    since: float | None = None,
+    limit: int = 100,
+):
+    return usage_ledger.query(session_id=session_id, endpoint=endpoint, model=model, since=since, limit=limit)
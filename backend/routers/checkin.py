@@ -1,22 +1,28 @@
 """Check-in API: session creation, text pipeline, and context queries."""
-import asyncio
 import logging
 from typing import Any
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException
 from pydantic import BaseModel
 
-from prompts import MAIN_QUESTIONS, QUESTION_SPOKEN_INTROS
-from services.openai_service import extract_structured
+from config import settings
+from services import survey_registry
+from services.executors import run_background, run_interactive
+from services.idempotency import IdempotencyConflict, fingerprint, run_once
+from services.openai_service import extract_structured, text_to_speech
 from services.session_manager import (
     analyze_response,
     clear_pending_follow_up,
     create_session,
+    finalize_session,
     get_coverage_info,
+    get_finalization,
     get_session,
     is_question_covered,
+    mark_question_completed,
     set_pending_follow_up,
     add_voice_turn,
+    session_survey,
 )
 
 logger = logging.getLogger(__name__)
@@ -52,28 +58,60 @@ def _recent_ai_prompts_for_question(session_id: str, question_index: int) -> lis
     return ai_texts[-3:]
 
 
+def _get_survey(survey_id: str | None) -> survey_registry.Survey:
+    try:
+        return survey_registry.get_survey(survey_id)
+    except survey_registry.UnknownSurvey as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
 # ── Session creation ────────────────────────────────────────────────────
 
+class SessionRequest(BaseModel):
+    survey_id: str | None = None
+
+
 @router.post("/session")
-def create_session_endpoint():
-    sid = create_session()
+def create_session_endpoint(body: SessionRequest | None = None):
+    survey = _get_survey(body.survey_id if body else None)
+    sid = create_session(survey.id)
     return {
         "session_id": sid,
-        "questions": MAIN_QUESTIONS,
-        "spoken_intros": QUESTION_SPOKEN_INTROS,
+        "survey_id": survey.id,
+        "questions": survey.questions,
+        "spoken_intros": survey.spoken_intros,
     }
 
 
 # ── Static data ─────────────────────────────────────────────────────────
 
+@router.get("/surveys")
+def get_surveys() -> list[dict[str, Any]]:
+    return [s.describe() for s in survey_registry.list_surveys()]
+
+
 @router.get("/questions")
-def get_questions() -> list[str]:
-    return MAIN_QUESTIONS
+def get_questions(survey_id: str | None = None) -> list[str]:
+    return _get_survey(survey_id).questions
 
 
 @router.get("/spoken-intros")
-def get_spoken_intros() -> list[str]:
-    return QUESTION_SPOKEN_INTROS
+def get_spoken_intros(survey_id: str | None = None) -> list[str]:
+    return _get_survey(survey_id).spoken_intros
+
+
+@router.get("/intro-audio/{question_index}")
+async def get_intro_audio(question_index: int, survey_id: str | None = None) -> dict[str, str]:
+    """Spoken intro as base64 mp3; rendered once per survey and served from cache afterwards."""
+    survey = _get_survey(survey_id)
+    if not 0 <= question_index < len(survey.questions):
+        raise HTTPException(status_code=404, detail="Unknown question index")
+    try:
+        audio = await run_background(survey_registry.intro_audio, survey, question_index, text_to_speech)
+    except Exception as e:
+        logger.warning("Intro audio error: %s", e)
+        raise HTTPException(status_code=503, detail="Intro audio unavailable")
+    return {"audio": audio or ""}
 
 
 # ── Check if a question was already answered ────────────────────────────
@@ -87,7 +125,18 @@ def check_covered(session_id: str, question_index: int):
 # ── Text submission ─────────────────────────────────────────────────────
 
 @router.post("/text-submit")
-async def text_submit(body: dict):
+async def text_submit(body: dict, idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
+    # Retries replay the original result instead of re-running analysis and re-embedding.
+    try:
+        return await run_once(
+            "text-submit", body.get("session_id", ""), idempotency_key, fingerprint(body),
+            lambda: _process_text_submit(body),
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+async def _process_text_submit(body: dict) -> dict[str, Any]:
     session_id = body.get("session_id", "")
     question_index = body.get("question_index", 0)
     response = body.get("response", "")
@@ -95,12 +144,15 @@ async def text_submit(body: dict):
 
     if not response.strip():
         raise HTTPException(status_code=400, detail="Response cannot be empty")
-
-    loop = asyncio.get_event_loop()
+    # Sessions live in one process; a request routed elsewhere must fail, not be dropped.
+    if not get_session(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    if not isinstance(question_index, int) or not 0 <= question_index < len(session_survey(session_id).questions):
+        raise HTTPException(status_code=422, detail="Unknown question index")
 
     try:
-        analysis = await loop.run_in_executor(
-            None, lambda: analyze_response(session_id, question_index, response, follow_up_count),
+        analysis = await run_interactive(
+            analyze_response, session_id, question_index, response, follow_up_count,
         )
     except Exception as e:
         logger.exception("Analysis error in text-submit")
@@ -134,14 +186,19 @@ async def text_submit(body: dict):
 
     structured = None
     if status in ("done", "move_on", "already_covered"):
-        main_q = MAIN_QUESTIONS[question_index] if question_index < len(MAIN_QUESTIONS) else ""
-        full_resp = summary or response
-        try:
-            structured = await loop.run_in_executor(
-                None, lambda: extract_structured(main_q, full_resp),
-            )
-        except Exception as e:
-            logger.warning("Extraction error: %s", e)
+        mark_question_completed(session_id, question_index)
+        # Fused mode already extracted in the analysis call; guardrail-forced finals fall through.
+        structured = analysis.get("extraction")
+        if structured is None and settings.inline_extraction_enabled:
+            survey = session_survey(session_id)
+            main_q = survey.question(question_index)
+            full_resp = summary or response
+            try:
+                structured = await run_background(
+                    extract_structured, main_q, full_resp, session_id, question_index, survey.id,
+                )
+            except Exception as e:
+                logger.warning("Extraction error: %s", e)
 
     return {
         "status": status,
@@ -153,6 +210,26 @@ async def text_submit(body: dict):
     }
 
 
+# ── End-of-session extraction ───────────────────────────────────────────
+
+@router.post("/complete/{session_id}")
+def complete_session(session_id: str) -> dict[str, Any]:
+    """Mark the check-in complete and queue extraction over every question's transcript."""
+    if not finalize_session(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    fin = get_finalization(session_id)
+    return {"status": fin["status"] if fin else "disabled"}
+
+
+@router.get("/results/{session_id}")
+def get_results(session_id: str) -> dict[str, Any]:
+    """End-of-session extraction status; `results` is filled once status is "done"."""
+    fin = get_finalization(session_id)
+    if fin is None:
+        raise HTTPException(status_code=404, detail="No end-of-session extraction for this session")
+    return {"status": fin["status"], "results": fin["results"], "error": fin["error"]}
+
+
 # ── Standalone extraction ───────────────────────────────────────────────
 
 class ExtractionRequest(BaseModel):
@@ -161,9 +238,9 @@ class ExtractionRequest(BaseModel):
 
 
 @router.post("/extract")
-def extract_body(body: ExtractionRequest) -> dict[str, Any]:
+async def extract_body(body: ExtractionRequest) -> dict[str, Any]:
     try:
-        return extract_structured(body.main_question, body.full_response)
+        return await run_background(extract_structured, body.main_question, body.full_response)
     except Exception as e:
         logger.exception("Extraction error")
         raise HTTPException(status_code=500, detail=str(e))
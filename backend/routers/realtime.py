@@ -1,25 +1,60 @@
-"""Realtime API: ephemeral token creation and transcript sync."""
+"""Realtime API: ephemeral token creation, transcript sync, and the live session channel."""
+import asyncio
+import json
 import logging
 from typing import Any
 
 import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Header, HTTPException, WebSocket, WebSocketDisconnect
 from pydantic import BaseModel
 
 from config import settings
-from prompts import MAIN_QUESTIONS, REALTIME_INSTRUCTIONS
+from prompts import REALTIME_SESSION_STATE
+from services import session_hub
+from services.idempotency import IdempotencyConflict, fingerprint, run_once
 from services.session_manager import (
     add_voice_turn,
     build_context_text,
     clear_pending_follow_up,
+    finalize_session,
     get_pending_follow_up,
     get_session,
+    get_session_state,
+    mark_question_completed,
+    session_survey,
 )
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/realtime", tags=["realtime"])
 
 OPENAI_SESSIONS_URL = "https://api.openai.com/v1/realtime/sessions"
+OPENAI_MODELS_URL = "https://api.openai.com/v1/models"
+
+_http_client: httpx.AsyncClient | None = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared async client so token requests reuse pooled TLS connections."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(timeout=15.0)
+    return _http_client
+
+
+async def warm_http_client():
+    key = settings.openai_api_key.strip().strip('"').strip("'")
+    resp = await get_http_client().get(
+        f"{OPENAI_MODELS_URL}/{settings.openai_realtime_model}",
+        headers={"Authorization": f"Bearer {key}"},
+    )
+    resp.raise_for_status()
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
 
 
 class TokenRequest(BaseModel):
@@ -34,6 +69,11 @@ class SyncRequest(BaseModel):
     ai_text: str = ""
 
 
+class ProgressRequest(BaseModel):
+    session_id: str
+    question_index: int
+
+
 @router.post("/token")
 async def create_realtime_token(body: TokenRequest):
     key = settings.openai_api_key.strip().strip('"').strip("'")
@@ -45,7 +85,9 @@ async def create_realtime_token(body: TokenRequest):
     completed = list(session.get("completed_qs", set())) if session else []
     pending = get_pending_follow_up(body.session_id) or {}
 
-    instructions = REALTIME_INSTRUCTIONS.format(
+    # Rules, questions and tools are precompiled per survey; only the session tail is formatted here.
+    survey = session_survey(body.session_id)
+    instructions = survey.realtime_instructions + REALTIME_SESSION_STATE.format(
         conversation_history=context,
         question_index=body.question_index,
         completed_questions=completed if completed else "none yet",
@@ -67,57 +109,20 @@ async def create_realtime_token(body: TokenRequest):
             "model": "whisper-1",
         },
         "modalities": ["text", "audio"],
-        "tools": [
-            {
-                "type": "function",
-                "name": "update_progress",
-                "description": "Call this EVERY TIME you finish getting a satisfactory answer for a main question. This updates the progress bar.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "question_index": {
-                            "type": "integer",
-                            "description": "0-based index of the completed question (0, 1, or 2)",
-                        },
-                        "summary": {
-                            "type": "string",
-                            "description": "2-3 sentence summary of what the participant said",
-                        },
-                    },
-                    "required": ["question_index", "summary"],
-                },
-            },
-            {
-                "type": "function",
-                "name": "complete_checkin",
-                "description": "Call this when ALL three questions have been answered and the check-in is complete.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "summaries": {
-                            "type": "array",
-                            "items": {"type": "string"},
-                            "description": "Summary for each of the 3 completed questions",
-                        },
-                    },
-                    "required": ["summaries"],
-                },
-            },
-        ],
+        "tools": survey.realtime_tools,
     }
 
     try:
-        async with httpx.AsyncClient(timeout=15.0) as client:
-            resp = await client.post(
-                OPENAI_SESSIONS_URL,
-                headers={
-                    "Authorization": f"Bearer {key}",
-                    "Content-Type": "application/json",
-                },
-                json=payload,
-            )
-            resp.raise_for_status()
-            data = resp.json()
+        resp = await get_http_client().post(
+            OPENAI_SESSIONS_URL,
+            headers={
+                "Authorization": f"Bearer {key}",
+                "Content-Type": "application/json",
+            },
+            json=payload,
+        )
+        resp.raise_for_status()
+        data = resp.json()
     except httpx.HTTPStatusError as e:
         logger.exception("OpenAI realtime session creation failed: %s", e.response.text)
         raise HTTPException(status_code=502, detail=f"OpenAI error: {e.response.text[:200]}")
@@ -136,11 +141,177 @@ async def create_realtime_token(body: TokenRequest):
 
 
 @router.post("/sync")
-async def sync_transcript(body: SyncRequest):
+async def sync_transcript(body: SyncRequest, idempotency_key: str | None = Header(None, alias="Idempotency-Key")):
     """Store voice conversation transcripts in the session for cross-mode context."""
+    try:
+        return await run_once(
+            "sync", body.session_id, idempotency_key, fingerprint(body.model_dump()),
+            lambda: _apply_sync(body),
+        )
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _require_question(session_id: str, q_idx: int):
+    # Sessions live in one process; a request routed elsewhere must fail, not be dropped.
+    if not get_session(session_id):
+        raise HTTPException(status_code=404, detail="Unknown session")
+    if _question_index(q_idx, len(session_survey(session_id).questions)) is None:
+        raise HTTPException(status_code=422, detail="Unknown question index")
+
+
+async def _apply_sync(body: SyncRequest) -> dict[str, Any]:
+    _require_question(body.session_id, body.question_index)
     if body.ai_text:
         add_voice_turn(body.session_id, body.question_index, "ai", body.ai_text)
     if body.user_text:
         add_voice_turn(body.session_id, body.question_index, "user", body.user_text)
         clear_pending_follow_up(body.session_id, body.question_index)
     return {"ok": True}
+
+
+@router.post("/progress")
+def mark_progress(body: ProgressRequest):
+    """Mark a question answered in voice mode (fallback for the channel's "progress" message)."""
+    _require_question(body.session_id, body.question_index)
+    mark_question_completed(body.session_id, body.question_index)
+    return {"ok": True}
+
+
+# ── Live session channel ────────────────────────────────────────────────
+#
+# Client -> server messages:
+#   {"type": "turns", "id": "...", "question_index": 0, "turns": [{"role": "user"|"ai", "text": "..."}]}
+#   {"type": "progress", "question_index": 0}
+#   {"type": "complete"}                      check-in finished; queue end-of-session extraction
+#   {"type": "ping"}
+# Server -> client messages:
+#   {"type": "state", "coverage": [...], "pending_follow_up": {...}|null, "completed_questions": [...], "turns": N, "seq": N}
+#   {"type": "ack", "id": "...", "applied": N}
+#   {"type": "pong"} / {"type": "error", "id": "...", "detail": "..."}   id echoed when the message had one
+#
+# Malformed messages (non-JSON frames, non-string ids, question indexes outside the survey)
+# get an error reply; the channel stays open.
+#
+# POST /sync, POST /progress, POST /api/checkin/complete and GET /api/checkin/check-covered
+# remain available as fallbacks.
+
+def _question_index(value: Any, count: int) -> int | None:
+    """A question index from a client message, or None unless it is an integer in [0, count)."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, str) and value.strip().lstrip("-").isdigit():
+        value = int(value)
+    if isinstance(value, int) and 0 <= value < count:
+        return value
+    return None
+
+
+def _validate_turns(msg: dict[str, Any], count: int) -> str | None:
+    """Error detail for a malformed "turns" message, or None if it can be applied."""
+    if not isinstance(msg.get("id") or "", str):
+        return "id must be a string"
+    if _question_index(msg.get("question_index", 0), count) is None:
+        return f"question_index must be an integer from 0 to {count - 1}"
+    turns = msg.get("turns") or []
+    if not isinstance(turns, list) or not all(isinstance(t, dict) for t in turns):
+        return "turns must be a list of objects"
+    for turn in turns:
+        if "question_index" in turn and _question_index(turn["question_index"], count) is None:
+            return f"turn question_index must be an integer from 0 to {count - 1}"
+        if not isinstance(turn.get("text") or "", str):
+            return "turn text must be a string"
+    return None
+
+
+def _apply_turns(session_id: str, default_q_idx: int, turns: list[dict[str, Any]], count: int) -> int:
+    applied = 0
+    for turn in turns:
+        role = turn.get("role")
+        text = (turn.get("text") or "").strip()
+        q_idx = _question_index(turn.get("question_index", default_q_idx), count)
+        if role not in ("user", "ai") or not text:
+            continue
+        add_voice_turn(session_id, q_idx, role, text)
+        if role == "user":
+            clear_pending_follow_up(session_id, q_idx)
+        applied += 1
+    return applied
+
+
+@router.websocket("/ws/{session_id}")
+async def session_channel(ws: WebSocket, session_id: str):
+    if not get_session(session_id):
+        await ws.close(code=4404)
+        return
+    await ws.accept()
+    count = len(session_survey(session_id).questions)
+
+    send_lock = asyncio.Lock()
+    last_state: dict[str, Any] | None = None
+
+    async def send(message: dict[str, Any]):
+        async with send_lock:
+            await ws.send_json(message)
+
+    async def push_state():
+        nonlocal last_state
+        state = get_session_state(session_id)
+        if state is not None and state != last_state:
+            last_state = state
+            await send({"type": "state", **state})
+
+    changes = session_hub.subscribe(session_id)
+
+    async def pump():
+        while True:
+            await changes.get()
+            await push_state()
+
+    pump_task = asyncio.create_task(pump())
+    try:
+        await push_state()
+        while True:
+            try:
+                msg = json.loads(await ws.receive_text())
+            except (KeyError, ValueError):  # binary frame / not JSON
+                await send({"type": "error", "detail": "Messages must be JSON text frames"})
+                continue
+            mtype = msg.get("type") if isinstance(msg, dict) else None
+            if mtype == "turns":
+                problem = _validate_turns(msg, count)
+                if problem:
+                    await send({"type": "error", "id": msg.get("id"), "detail": problem})
+                    continue
+                q_idx = _question_index(msg.get("question_index", 0), count)
+                turns = msg.get("turns") or []
+
+                async def apply():
+                    return _apply_turns(session_id, q_idx, turns, count)
+
+                # A resent batch (same id) after a reconnect is not applied twice.
+                try:
+                    applied = await run_once("ws-turns", session_id, msg.get("id"), fingerprint(msg), apply)
+                except IdempotencyConflict as e:
+                    await send({"type": "error", "id": msg.get("id"), "detail": str(e)})
+                    continue
+                await send({"type": "ack", "id": msg.get("id"), "applied": applied})
+            elif mtype == "progress":
+                q_idx = _question_index(msg.get("question_index"), count)
+                if q_idx is None:
+                    await send({"type": "error", "detail": f"question_index must be an integer from 0 to {count - 1}"})
+                    continue
+                mark_question_completed(session_id, q_idx)
+            elif mtype == "complete":
+                finalize_session(session_id)
+            elif mtype == "ping":
+                await send({"type": "pong"})
+            else:
+                await send({"type": "error", "detail": f"Unknown message type: {mtype!r}"})
+    except WebSocketDisconnect:
+        pass
+    except Exception as e:
+        logger.warning("Session channel %s closed with error: %s", session_id, e)
+    finally:
+        pump_task.cancel()
+        session_hub.unsubscribe(session_id, changes)
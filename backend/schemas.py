@@ -0,0 +1,68 @@
+"""Structured output schemas for analysis and extraction (sent to OpenAI as strict JSON schemas)."""
+from typing import Any, Literal
+
+from pydantic import BaseModel, ConfigDict, Field
+
+AnalysisStatus = Literal["done", "needs_follow_up", "already_covered", "move_on"]
+
+
+class AnalysisResult(BaseModel):
+    """Full analysis wire format, matching CONTEXT_ANALYSIS_SYSTEM."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    status: AnalysisStatus
+    reason: str
+    follow_up: str
+    covered_future_indices: list[int]
+    summary: str
+
+    def to_dict(self) -> dict[str, Any]:
+        return self.model_dump()
+
+
+class CompactAnalysisResult(BaseModel):
+    """Minimal-token analysis wire format: no reason, one-letter keys."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    s: AnalysisStatus = Field(description="status")
+    f: str = Field(description="follow-up or transition text, empty if none")
+    c: list[int] = Field(description="0-based indices of remaining questions already answered")
+    m: str = Field(description="1-2 sentence summary of what the participant said")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "status": self.s,
+            "reason": "",
+            "follow_up": self.f,
+            "covered_future_indices": self.c,
+            "summary": self.m,
+        }
+
+
+class ExtractionResult(BaseModel):
+    """Structured impact data, matching STRUCTURED_EXTRACTION_SYSTEM."""
+
+    model_config = ConfigDict(extra="forbid")
+
+    tried: str | None
+    what_happened: str | None
+    barriers: list[str]
+    specificity_level: Literal["low", "medium", "high"]
+    quote: str | None
+
+
+class FusedAnalysisResult(AnalysisResult):
+    """Analysis plus extraction in one completion, matching CONTEXT_ANALYSIS_SYSTEM_FUSED."""
+
+    extraction: ExtractionResult | None = None
+
+
+class CompactFusedAnalysisResult(CompactAnalysisResult):
+    """Compact wire format plus extraction under `x`."""
+
+    x: ExtractionResult | None = Field(default=None, description="extraction for final statuses, else null")
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**super().to_dict(), "extraction": self.x.model_dump() if self.x else None}
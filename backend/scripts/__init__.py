@@ -0,0 +1 @@
+# Offline benchmarks and maintenance scripts (run from backend/: python -m scripts.<name>)
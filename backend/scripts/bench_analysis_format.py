@@ -0,0 +1,50 @@
+"""
+Compare full vs compact analysis output: completion tokens and latency.
+
+Runs the same sample turns through analyze_response in both modes against the
+configured OpenAI model and prints the usage ledger grouped by endpoint. The turns
+are stored in an in-memory vector store, never in chroma_data/.
+
+Usage (from backend/):  python -m scripts.bench_analysis_format [--rounds 3]
+"""
+import argparse
+import json
+
+from config import settings
+from services import usage_ledger, vector_store
+from services.session_manager import analyze_response, create_session
+
+SAMPLE_TURNS = [
+    (0, "I started using the prompt templates from the course to draft our weekly status memo."),
+    (0, "stuff with AI I guess"),
+    (1, "It cut the memo from two hours to about thirty minutes and my manager liked the format."),
+    (1, "it was good"),
+    (2, "Honestly the biggest barrier is that IT hasn't approved the tool for sensitive data yet."),
+    (2, "nothing"),
+]
+
+
+def run(rounds: int):
+    vector_store.use_ephemeral()
+    for compact in (False, True):
+        settings.analysis_compact_output = compact
+        for _ in range(rounds):
+            sid = create_session()
+            for q_idx, text in SAMPLE_TURNS:
+                analyze_response(sid, q_idx, text, follow_up_count=0)
+
+    report = usage_ledger.summary(group_by=("endpoint",))
+    full = report["groups"].get("analysis", {})
+    compact = report["groups"].get("analysis.compact", {})
+    print(json.dumps({"full": full, "compact": compact, "parse_failures": report["parse_failures"]}, indent=2))
+    if full.get("calls") and compact.get("calls"):
+        per_call = lambda g: g["completion_tokens"] / g["calls"]
+        print(f"completion tokens/call: {per_call(full):.1f} -> {per_call(compact):.1f} "
+              f"({1 - per_call(compact) / per_call(full):.0%} fewer)")
+        print(f"p50 latency: {full['latency_ms_p50']}ms -> {compact['latency_ms_p50']}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3)
+    run(parser.parse_args().rounds)
@@ -0,0 +1,102 @@
+"""
+Compare the local hashing embedding backend with OpenAI embeddings on stored turns.
+
+Reads participant turns (and their stored OpenAI vectors) from the OpenAI-backed
+session_responses collections, then reports:
+  - embedding latency per document for each backend (OpenAI only if a key is set)
+  - retrieval agreement: for each turn used as a query, overlap between the two
+    backends' top-k nearest neighbours (same-question scope, self excluded)
+
+Usage (from backend/):  python -m scripts.bench_embeddings [--k 5] [--limit 2000]
+"""
+import argparse
+import json
+import time
+
+import numpy as np
+
+from config import settings
+from services import vector_store
+from services.embeddings import HashingEmbeddingFunction, create_embedding_function
+
+
+def _load_corpus(limit: int) -> tuple[list[str], list[int], np.ndarray | None]:
+    import chromadb
+
+    client = chromadb.PersistentClient(path=str(vector_store.CHROMA_DIR))
+    docs: list[str] = []
+    q_idx: list[int] = []
+    vecs: list = []
+    for c in client.list_collections():
+        name = c if isinstance(c, str) else c.name
+        if not name.startswith("session_responses") or "__" in name:
+            continue
+        page = client.get_collection(name).get(include=["documents", "metadatas", "embeddings"], limit=limit)
+        for doc, meta, vec in zip(page["documents"], page["metadatas"], page["embeddings"]):
+            if doc and doc.strip():
+                docs.append(doc)
+                q_idx.append(int((meta or {}).get("question_idx", -1)))
+                vecs.append(vec)
+    stored = np.asarray(vecs, dtype=np.float32) if vecs else None
+    return docs[:limit], q_idx[:limit], stored[:limit] if stored is not None else None
+
+
+def _normalize(m: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return m / norms
+
+
+def _top_k(m: np.ndarray, groups: list[int], k: int) -> list[set[int]]:
+    sims = _normalize(m) @ _normalize(m).T
+    np.fill_diagonal(sims, -np.inf)
+    g = np.asarray(groups)
+    sims[g[:, None] != g[None, :]] = -np.inf  # queries are scoped to one question, like the app's
+    out = []
+    for row in sims:
+        valid = np.flatnonzero(np.isfinite(row))
+        ranked = valid[np.argsort(-row[valid])][:k]
+        out.append(set(ranked.tolist()))
+    return out
+
+
+def _timed_embed(fn, docs: list[str], batch: int = 64) -> tuple[np.ndarray, float]:
+    start = time.perf_counter()
+    rows = []
+    for i in range(0, len(docs), batch):
+        rows.extend(fn(docs[i:i + batch]))
+    return np.asarray(rows, dtype=np.float32), (time.perf_counter() - start) / max(1, len(docs))
+
+
+def run(k: int, limit: int):
+    docs, groups, stored = _load_corpus(limit)
+    if len(docs) < 2:
+        print("Not enough stored turns to compare.")
+        return
+
+    local, local_s = _timed_embed(HashingEmbeddingFunction(settings.hashing_embedding_dim), docs)
+    report = {"documents": len(docs), "k": k, "hashing_ms_per_doc": round(local_s * 1000, 4)}
+
+    reference = stored
+    if settings.openai_api_key.strip():
+        reference, openai_s = _timed_embed(create_embedding_function("openai"), docs)
+        report["openai_ms_per_doc"] = round(openai_s * 1000, 2)
+    if reference is None:
+        print("No stored OpenAI vectors and no OPENAI_API_KEY; cannot compute agreement.")
+        return
+
+    ref_nn = _top_k(reference, groups, k)
+    loc_nn = _top_k(local, groups, k)
+    overlaps = [len(a & b) / len(a) for a, b in zip(ref_nn, loc_nn) if a]
+    top1 = [bool(a & b) for a, b in zip(_top_k(reference, groups, 1), loc_nn) if a]
+    report["overlap_at_k"] = round(float(np.mean(overlaps)), 4) if overlaps else None
+    report["openai_top1_in_hashing_top_k"] = round(float(np.mean(top1)), 4) if top1 else None
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=2000)
+    args = parser.parse_args()
+    run(args.k, args.limit)
@@ -0,0 +1,127 @@
+"""
+Build the curated extraction exemplar index from stored check-in turns.
+
+Participant turns are read from the session_responses Chroma collections and grouped
+per (session, question) into the full response, as text-submit would extract it. Each
+candidate is labelled with the reference extraction model (OPENAI_EXTRACTION_MODEL), and
+only specific, schema-valid extractions are kept. Inputs are embedded once with the
+configured embedding backend and written to backend/exemplar_data/.
+
+Usage (from backend/):  python -m scripts.build_exemplars [--min-words 12] [--max-per-question 200]
+"""
+import argparse
+import json
+import re
+import time
+
+import numpy as np
+
+from config import settings
+from schemas import ExtractionResult
+from services import vector_store
+from services.embeddings import create_embedding_function
+from services.exemplars import EXEMPLAR_DIR, RECORDS_PATH, VECTORS_PATH
+from services.openai_service import run_extraction
+
+
+def _turn_order(doc_id: str, meta: dict) -> float:
+    if meta.get("ts") is not None:
+        return float(meta["ts"])
+    tail = doc_id.rsplit("_", 1)[-1]
+    return float(tail) if tail.isdigit() else 0.0
+
+
+def _load_candidates(min_words: int) -> list[dict]:
+    """Full responses per (session, question) from every shard of the configured backend."""
+    client = vector_store._init()
+    grouped: dict[tuple[str, int], list[tuple[float, str, dict]]] = {}
+    for name in vector_store.list_shards():
+        coll = client.get_collection(name)
+        offset = 0
+        while True:
+            page = coll.get(include=["documents", "metadatas"], limit=500, offset=offset)
+            if not page["ids"]:
+                break
+            for doc_id, doc, meta in zip(page["ids"], page["documents"], page["metadatas"]):
+                meta = meta or {}
+                if doc and doc.strip() and meta.get("session_id") is not None:
+                    key = (meta["session_id"], int(meta.get("question_idx", -1)))
+                    grouped.setdefault(key, []).append((_turn_order(doc_id, meta), doc.strip(), meta))
+            offset += 500
+
+    seen: set[str] = set()
+    candidates = []
+    for (sid, q_idx), turns in grouped.items():
+        turns.sort(key=lambda t: t[0])
+        text = " ".join(t[1] for t in turns)
+        norm = re.sub(r"\W+", " ", text.lower()).strip()
+        if len(norm.split()) < min_words or norm in seen:
+            continue
+        seen.add(norm)
+        meta = turns[-1][2]
+        candidates.append({
+            "session_id": sid,
+            "survey_id": meta.get("survey_id") or settings.default_survey_id,
+            "question_idx": q_idx,
+            "question": meta.get("question", ""),
+            "input": text,
+        })
+    return candidates
+
+
+def _curated(output: dict) -> bool:
+    """Keep only extractions worth imitating: schema-valid, concrete, with a stated action."""
+    try:
+        result = ExtractionResult.model_validate(output)
+    except Exception:
+        return False
+    return result.specificity_level in ("medium", "high") and bool((result.tried or "").strip())
+
+
+def run(min_words: int, max_per_question: int):
+    if not settings.openai_api_key.strip():
+        print("OPENAI_API_KEY is required to label exemplars with the reference model.")
+        return
+    candidates = _load_candidates(min_words)
+    print(f"{len(candidates)} candidate responses")
+
+    kept: list[dict] = []
+    per_question: dict[int, int] = {}
+    for cand in candidates:
+        if per_question.get(cand["question_idx"], 0) >= max_per_question:
+            continue
+        try:
+            output = run_extraction(cand["question"], cand["input"], endpoint="extraction.build")
+        except Exception as e:
+            print(f"  skip {cand['session_id']} Q{cand['question_idx'] + 1}: {e}")
+            continue
+        if _curated(output):
+            kept.append({**cand, "output": output})
+            per_question[cand["question_idx"]] = per_question.get(cand["question_idx"], 0) + 1
+
+    if not kept:
+        print("No exemplars passed curation; index not written.")
+        return
+
+    embed_fn = create_embedding_function()
+    vectors = np.asarray(embed_fn([r["input"] for r in kept]), dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+
+    EXEMPLAR_DIR.mkdir(parents=True, exist_ok=True)
+    np.save(VECTORS_PATH, vectors / norms)
+    RECORDS_PATH.write_text(json.dumps({
+        "built_at": time.time(),
+        "embedding_backend": settings.embedding_backend,
+        "reference_model": settings.openai_extraction_model,
+        "records": kept,
+    }), encoding="utf-8")
+    print(json.dumps({"exemplars": len(kept), "per_question": per_question, "path": str(EXEMPLAR_DIR)}, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--min-words", type=int, default=12)
+    parser.add_argument("--max-per-question", type=int, default=200)
+    args = parser.parse_args()
+    run(args.min_words, args.max_per_question)
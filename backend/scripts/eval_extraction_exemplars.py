@@ -0,0 +1,118 @@
+"""
+Evaluate few-shot extraction on the exemplar model against the current extraction model.
+
+Leave-one-out over the exemplar index: each exemplar's input is extracted by the reference
+model (OPENAI_EXTRACTION_MODEL, zero-shot) and by EXTRACTION_EXEMPLAR_MODEL with its k
+nearest *other* exemplars, optionally also by the exemplar model zero-shot. Reports
+per-field agreement with the reference output and latency percentiles per variant.
+
+Usage (from backend/):  python -m scripts.eval_extraction_exemplars [--limit 50] [--k 3] [--zero-shot]
+"""
+import argparse
+import json
+import re
+import time
+
+from config import settings
+from services import exemplars
+from services.openai_service import run_extraction
+
+
+def _tokens(text) -> set[str]:
+    return {t for t in re.findall(r"[a-z0-9']+", str(text or "").lower()) if len(t) > 2}
+
+
+def _jaccard(a, b) -> float:
+    ta, tb = _tokens(a), _tokens(b)
+    if not ta and not tb:
+        return 1.0
+    return len(ta & tb) / len(ta | tb)
+
+
+def _agreement(candidate: dict, reference: dict) -> dict[str, float]:
+    out = {"specificity_level": float(candidate.get("specificity_level") == reference.get("specificity_level"))}
+    for field in ("tried", "what_happened", "quote"):
+        a, b = candidate.get(field), reference.get(field)
+        out[f"{field}_null_match"] = float((a is None) == (b is None))
+        out[f"{field}_overlap"] = _jaccard(a, b)
+    ba, bb = candidate.get("barriers") or [], reference.get("barriers") or []
+    out["barriers_count_match"] = float(len(ba) == len(bb))
+    out["barriers_overlap"] = _jaccard(" ".join(ba), " ".join(bb))
+    return out
+
+
+def _timed(fn) -> tuple[dict | None, float]:
+    start = time.perf_counter()
+    try:
+        return fn(), time.perf_counter() - start
+    except Exception as e:
+        print(f"  call failed: {e}")
+        return None, time.perf_counter() - start
+
+
+def _pct(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))] * 1000, 1)
+
+
+def run(limit: int, k: int, zero_shot: bool):
+    if not settings.openai_api_key.strip():
+        print("OPENAI_API_KEY is required.")
+        return
+    if not exemplars.load():
+        print("No exemplar index; run python -m scripts.build_exemplars first.")
+        return
+    records = exemplars._index["records"][:limit]
+
+    variants = {"fewshot": [], "zero_shot": []} if zero_shot else {"fewshot": []}
+    latencies: dict[str, list[float]] = {"reference": [], **{v: [] for v in variants}}
+    for rec in records:
+        reference, ref_s = _timed(lambda: run_extraction(rec["question"], rec["input"], endpoint="extraction.eval"))
+        if reference is None:
+            continue
+        latencies["reference"].append(ref_s)
+
+        shots = exemplars.nearest(
+            rec["input"], rec.get("question_idx"), k, exclude=rec["input"], survey_id=rec.get("survey_id"),
+        )
+        fewshot, few_s = _timed(lambda: run_extraction(
+            rec["question"], rec["input"],
+            model=settings.extraction_exemplar_model, shots=shots, endpoint="extraction.eval",
+        ))
+        if fewshot is not None:
+            latencies["fewshot"].append(few_s)
+            variants["fewshot"].append(_agreement(fewshot, reference))
+        if zero_shot:
+            plain, plain_s = _timed(lambda: run_extraction(
+                rec["question"], rec["input"],
+                model=settings.extraction_exemplar_model, endpoint="extraction.eval",
+            ))
+            if plain is not None:
+                latencies["zero_shot"].append(plain_s)
+                variants["zero_shot"].append(_agreement(plain, reference))
+
+    report = {
+        "evaluated": len(latencies["reference"]),
+        "reference_model": settings.openai_extraction_model,
+        "exemplar_model": settings.extraction_exemplar_model,
+        "k": k,
+        "latency_ms": {name: {"p50": _pct(v, 0.5), "p95": _pct(v, 0.95)} for name, v in latencies.items()},
+        "agreement": {},
+    }
+    for name, rows in variants.items():
+        if rows:
+            fields = {f: round(sum(r[f] for r in rows) / len(rows), 4) for f in rows[0]}
+            fields["mean"] = round(sum(fields.values()) / len(fields), 4)
+            report["agreement"][name] = fields
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument("--zero-shot", action="store_true", help="also run the exemplar model without exemplars")
+    args = parser.parse_args()
+    run(args.limit, args.k, args.zero_shot)
@@ -0,0 +1,101 @@
+"""Pluggable embedding backends for the vector store: OpenAI or a local CPU feature-hashing vectorizer."""
+import logging
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Any
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("openai", "hashing")
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+_STOPWORDS = frozenset(
+    "a an and are as at be been but by for from had has have i if in into is it its me my of on or our so "
+    "that the their them then there these they this to was we were what when which who will with you your".split()
+)
+
+
+def _tokens(text: str) -> list[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in _STOPWORDS]
+
+
+def _features(text: str) -> Counter:
+    """Unigrams plus adjacent-word bigrams, so short phrases ("team responded") carry weight."""
+    toks = _tokens(text)
+    feats = Counter(toks)
+    feats.update(f"{a} {b}" for a, b in zip(toks, toks[1:]))
+    return feats
+
+
+class HashingEmbeddingFunction:
+    """
+    In-process embeddings: feature-hashed unigrams/bigrams with sublinear TF and L2 normalization.
+    No network, no model files; a batch of short turns embeds in well under a millisecond per document.
+    """
+
+    def __init__(self, dim: int = 1024):
+        self.dim = int(dim)
+
+    def __call__(self, input: list[str]) -> list[Any]:
+        import numpy as np
+
+        out = np.zeros((len(input), self.dim), dtype=np.float32)
+        for row, text in enumerate(input):
+            for feat, tf in _features(text).items():
+                h = zlib.crc32(feat.encode("utf-8"))
+                sign = 1.0 if h & 0x80000000 else -1.0
+                out[row, h % self.dim] += sign * (1.0 + math.log(tf))
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return list(out / norms)
+
+    # chromadb EmbeddingFunction protocol, so collections can persist which backend built them.
+    @staticmethod
+    def name() -> str:
+        return "innovateus-hashing"
+
+    def get_config(self) -> dict[str, Any]:
+        return {"dim": self.dim}
+
+    @staticmethod
+    def build_from_config(config: dict[str, Any]) -> "HashingEmbeddingFunction":
+        return HashingEmbeddingFunction(dim=config.get("dim", 1024))
+
+    def is_legacy(self) -> bool:
+        return False
+
+    def default_space(self) -> str:
+        return "l2"
+
+    def supported_spaces(self) -> list[str]:
+        return ["cosine", "l2", "ip"]
+
+    def embed_query(self, input: list[str]) -> list[Any]:
+        return self(input)
+
+
+def create_embedding_function(backend: str | None = None):
+    """Build the embedding function for `backend` (defaults to settings.embedding_backend)."""
+    backend = (backend or settings.embedding_backend).strip().lower()
+    if backend == "hashing":
+        return HashingEmbeddingFunction(dim=settings.hashing_embedding_dim)
+    if backend != "openai":
+        raise ValueError(f"Unknown embedding backend {backend!r}; expected one of {BACKENDS}")
+
+    from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
+
+    key = settings.openai_api_key.strip().strip('"').strip("'")
+    return OpenAIEmbeddingFunction(
+        api_key=key,
+        model_name=settings.openai_embedding_model,
+    )
+
+
+def collection_base_name(backend: str | None = None) -> str:
+    """Vectors from different backends are not comparable, so each backend gets its own collections."""
+    backend = (backend or settings.embedding_backend).strip().lower()
+    return "session_responses" if backend == "openai" else f"session_responses__{backend}"
@@ -0,0 +1,134 @@
+"""Bounded executors per workload class: interactive analysis, background extraction, vector-store I/O."""
+import asyncio
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class PriorityExecutor:
+    """Fixed-size worker pool that drains higher-priority work first and tracks utilization."""
+
+    def __init__(self, name: str, workers: int):
+        self.name = name
+        self.max_workers = max(1, workers)
+        self._heap: list[tuple[int, int, Future, Callable, tuple, dict, float]] = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._started_at = time.monotonic()
+        self._active = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._max_queued = 0
+        self._busy_s = 0.0
+        self._wait_s = 0.0
+        for i in range(self.max_workers):
+            t = threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            t.start()
+
+    def submit(self, fn: Callable, *args, priority: int = PRIORITY_BACKGROUND, **kwargs) -> Future:
+        fut: Future = Future()
+        with self._cond:
+            heapq.heappush(self._heap, (priority, next(self._seq), fut, fn, args, kwargs, time.monotonic()))
+            self._submitted += 1
+            self._max_queued = max(self._max_queued, len(self._heap))
+            self._cond.notify()
+        return fut
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                _, _, fut, fn, args, kwargs, queued_at = heapq.heappop(self._heap)
+                if not fut.set_running_or_notify_cancel():
+                    continue
+                self._active += 1
+                self._wait_s += time.monotonic() - queued_at
+            started = time.monotonic()
+            ok = True
+            try:
+                fut.set_result(fn(*args, **kwargs))
+            except BaseException as e:
+                ok = False
+                fut.set_exception(e)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    self._busy_s += time.monotonic() - started
+                    self._completed += 1
+                    if not ok:
+                        self._failed += 1
+
+    def stats(self) -> dict[str, Any]:
+        with self._cond:
+            uptime = max(1e-9, time.monotonic() - self._started_at)
+            started = self._completed + self._active
+            return {
+                "max_workers": self.max_workers,
+                "active": self._active,
+                "queued": len(self._heap),
+                "max_queued": self._max_queued,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "utilization": round(self._busy_s / (uptime * self.max_workers), 4),
+                "avg_queue_wait_ms": round(self._wait_s / started * 1000, 1) if started else 0.0,
+            }
+
+
+interactive_pool = PriorityExecutor("interactive", settings.interactive_pool_size)
+background_pool = PriorityExecutor("background", settings.background_pool_size)
+vector_pool = PriorityExecutor("vector-io", settings.vector_pool_size)
+
+# Hedged analysis attempts run as tasks on one event-loop thread rather than on a pool:
+# cancelling the losing task aborts its HTTP request even while it waits for the first token.
+_hedge_loop: asyncio.AbstractEventLoop | None = None
+_hedge_loop_lock = threading.Lock()
+
+
+async def run_interactive(fn: Callable, *args, **kwargs) -> Any:
+    """Run user-facing work (analysis) on the interactive pool."""
+    return await asyncio.wrap_future(interactive_pool.submit(fn, *args, priority=PRIORITY_INTERACTIVE, **kwargs))
+
+
+async def run_background(fn: Callable, *args, **kwargs) -> Any:
+    """Run deferrable work (extraction) on the background pool."""
+    return await asyncio.wrap_future(background_pool.submit(fn, *args, priority=PRIORITY_BACKGROUND, **kwargs))
+
+
+def run_vector(fn: Callable, *args, interactive: bool = True, **kwargs) -> Any:
+    """Run a vector-store call on the vector pool and wait for its result."""
+    priority = PRIORITY_INTERACTIVE if interactive else PRIORITY_BACKGROUND
+    return vector_pool.submit(fn, *args, priority=priority, **kwargs).result()
+
+
+def submit_vector(fn: Callable, *args, **kwargs) -> Future:
+    """Queue a background vector-store write without waiting for it."""
+    return vector_pool.submit(fn, *args, priority=PRIORITY_BACKGROUND, **kwargs)
+
+
+def run_hedged(coro) -> Any:
+    """Run `coro` on the hedge event loop (started on first use) and block for its result."""
+    global _hedge_loop
+    with _hedge_loop_lock:
+        if _hedge_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(target=loop.run_forever, name="analysis-hedge", daemon=True).start()
+            _hedge_loop = loop
+    return asyncio.run_coroutine_threadsafe(coro, _hedge_loop).result()
+
+
+def pool_stats() -> dict[str, dict[str, Any]]:
+    return {p.name: p.stats() for p in (interactive_pool, background_pool, vector_pool)}
@@ -0,0 +1,123 @@
+"""Curated extraction exemplars: an in-memory embedding matrix for nearest-neighbour few-shot prompts.
+
+The index is built offline by `python -m scripts.build_exemplars` and loaded once; lookups
+are a single matrix-vector product.
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any
+
+from config import BACKEND_DIR, settings
+
+logger = logging.getLogger(__name__)
+
+EXEMPLAR_DIR = BACKEND_DIR / "exemplar_data"
+VECTORS_PATH = EXEMPLAR_DIR / "exemplars.npy"
+RECORDS_PATH = EXEMPLAR_DIR / "exemplars.json"
+
+_index: dict[str, Any] | None = None
+_lock = threading.Lock()
+_stats = {"lookups": 0, "hits": 0, "lookup_ms_total": 0.0}
+
+
+def load(force: bool = False) -> bool:
+    """Load the index from disk; False (and few-shot extraction stays off) if it is missing or unusable."""
+    global _index
+    with _lock:
+        if _index is not None and not force:
+            return bool(_index["records"])
+        _index = {"records": [], "matrix": None, "question_idx": None, "survey_id": None, "embed_fn": None, "meta": {}}
+        if not (VECTORS_PATH.exists() and RECORDS_PATH.exists()):
+            logger.info("No exemplar index at %s", EXEMPLAR_DIR)
+            return False
+        try:
+            import numpy as np
+
+            from services.embeddings import create_embedding_function
+
+            meta = json.loads(RECORDS_PATH.read_text(encoding="utf-8"))
+            matrix = np.load(VECTORS_PATH).astype(np.float32)
+            records = meta.pop("records")
+            if matrix.shape[0] != len(records):
+                raise ValueError(f"{matrix.shape[0]} vectors for {len(records)} records")
+            # Queries must be embedded by the backend that built the index.
+            embed_fn = create_embedding_function(meta.get("embedding_backend"))
+        except Exception as e:
+            logger.warning("Exemplar index unusable, few-shot extraction disabled: %s", e)
+            return False
+        _index.update(
+            records=records,
+            matrix=matrix,
+            question_idx=np.asarray([r.get("question_idx", -1) for r in records]),
+            survey_id=np.asarray([r.get("survey_id") or settings.default_survey_id for r in records]),
+            embed_fn=embed_fn,
+            meta=meta,
+        )
+    logger.info("Loaded %d extraction exemplar(s) (built %s)", len(records), meta.get("built_at"))
+    return True
+
+
+def nearest(
+    text: str,
+    question_idx: int | None = None,
+    k: int = 3,
+    exclude: str | None = None,
+    survey_id: str | None = None,
+) -> list[dict[str, Any]]:
+    """
+    Up to `k` exemplars most similar to `text`, only from `survey_id` (when given) and
+    preferring the same question. `exclude` drops an exemplar whose input equals it
+    (used for leave-one-out evaluation).
+    """
+    if _index is None:
+        load()
+    if not _index["records"] or not (text or "").strip() or k <= 0:
+        return []
+    import numpy as np
+
+    start = time.perf_counter()
+    try:
+        query = np.asarray(_index["embed_fn"]([text])[0], dtype=np.float32)
+    except Exception as e:
+        logger.warning("Exemplar query embedding failed: %s", e)
+        return []
+    norm = np.linalg.norm(query)
+    scores = _index["matrix"] @ (query / norm if norm else query)
+    if survey_id is not None:
+        # Question indexes only line up within a survey, so other surveys are never used.
+        scores = np.where(_index["survey_id"] == survey_id, scores, -np.inf)
+    if question_idx is not None:
+        same = (_index["question_idx"] == question_idx) & np.isfinite(scores)
+        if same.any():
+            scores = np.where(same, scores, -np.inf)
+    order = np.argsort(-scores)
+    records = _index["records"]
+    out = []
+    for i in order:
+        if not np.isfinite(scores[i]):
+            break
+        if exclude is not None and records[i]["input"] == exclude:
+            continue
+        out.append(records[i])
+        if len(out) >= k:
+            break
+    _stats["lookups"] += 1
+    _stats["hits"] += bool(out)
+    _stats["lookup_ms_total"] += (time.perf_counter() - start) * 1000
+    return out
+
+
+def get_stats() -> dict[str, Any]:
+    size = len(_index["records"]) if _index else 0
+    lookups = _stats["lookups"]
+    return {
+        "enabled": settings.extraction_exemplars_enabled,
+        "model": settings.extraction_exemplar_model,
+        "size": size,
+        "built_at": (_index or {}).get("meta", {}).get("built_at"),
+        "lookups": lookups,
+        "hits": _stats["hits"],
+        "avg_lookup_ms": round(_stats["lookup_ms_total"] / lookups, 3) if lookups else 0.0,
+    }
@@ -0,0 +1,92 @@
+"""Idempotency-Key result cache and single-flight coalescing for retried requests."""
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_RESULTS = 10_000
+
+# (scope, session_id, key) -> (expires_at, fingerprint, result)
+_results: dict[tuple[str, str, str], tuple[float, str, Any]] = {}
+_inflight: dict[tuple[str, str, str], asyncio.Future] = {}
+_stats = {"executed": 0, "replayed": 0, "coalesced": 0, "conflicts": 0}
+
+
+class IdempotencyConflict(Exception):
+    """The Idempotency-Key was already used for a request with a different body."""
+
+
+def fingerprint(payload: Any) -> str:
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _prune(now: float):
+    expired = [k for k, (exp, _, _) in _results.items() if exp <= now]
+    for k in expired:
+        _results.pop(k, None)
+    while len(_results) > _MAX_RESULTS:
+        _results.pop(next(iter(_results)))
+
+
+async def run_once(
+    scope: str,
+    session_id: str,
+    key: str | None,
+    payload_fingerprint: str,
+    fn: Callable[[], Awaitable[Any]],
+) -> Any:
+    """
+    Run `fn` at most once per Idempotency-Key (replaying the stored result within the TTL),
+    and coalesce identical in-flight requests for the same session and turn.
+    """
+    key = (key or "").strip()
+    now = time.time()
+    cache_key = (scope, session_id, key) if key else None
+
+    if cache_key is not None:
+        hit = _results.get(cache_key)
+        if hit and hit[0] > now:
+            if hit[1] != payload_fingerprint:
+                _stats["conflicts"] += 1
+                raise IdempotencyConflict(f"Idempotency-Key {key!r} was used with a different request body")
+            _stats["replayed"] += 1
+            return hit[2]
+
+    flight_key = cache_key or (scope, session_id, f"fp:{payload_fingerprint}")
+    pending = _inflight.get(flight_key)
+    if pending is not None:
+        _stats["coalesced"] += 1
+        logger.info("Coalesced duplicate %s request for session %s", scope, session_id)
+        return await asyncio.shield(pending)
+
+    fut: asyncio.Future = asyncio.get_running_loop().create_future()
+    _inflight[flight_key] = fut
+    _stats["executed"] += 1
+    try:
+        result = await fn()
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # mark retrieved when nobody else was waiting
+        raise
+    finally:
+        _inflight.pop(flight_key, None)
+
+    fut.set_result(result)
+    if cache_key is not None:
+        _prune(now)
+        _results[cache_key] = (time.time() + settings.idempotency_ttl_s, payload_fingerprint, result)
+    return result
+
+
+def get_stats() -> dict[str, Any]:
+    return {**_stats, "cached": len(_results), "in_flight": len(_inflight)}
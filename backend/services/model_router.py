@@ -0,0 +1,112 @@
+"""Adaptive model routing: pick model and max_tokens per LLM call from cheap local features of the input."""
+import re
+import threading
+from collections import deque
+from typing import Any
+
+from config import settings
+
+# Concrete details that make a response easier to judge: numbers, time references, examples.
+_SPECIFIC_RE = re.compile(
+    r"\d+|\b(?:minutes?|hours?|days?|weeks?|months?|years?|yesterday|today|monday|tuesday|wednesday"
+    r"|thursday|friday|manager|team|colleagues?|supervisor|report|memo|meeting|email|process|example"
+    r"|instance|because|so that|result(?:ed)?|reduced|increased|saved)\b",
+    re.IGNORECASE,
+)
+
+
+class Route:
+    def __init__(self, name: str, model: str, max_tokens: int):
+        self.name = name
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def __repr__(self) -> str:
+        return f"Route({self.name!r}, {self.model!r}, {self.max_tokens})"
+
+
+def features(text: str, follow_up_count: int = 0, has_coverage: bool = False) -> dict[str, Any]:
+    text = text or ""
+    return {
+        "words": len(text.split()),
+        "specificity": len(_SPECIFIC_RE.findall(text)),
+        "follow_ups": follow_up_count,
+        "has_coverage": has_coverage,
+    }
+
+
+def _matches(rule: dict[str, Any], feats: dict[str, Any]) -> bool:
+    """Every bound present in the rule must hold; absent bounds are ignored."""
+    checks = (
+        ("min_words", lambda v: feats["words"] >= v),
+        ("max_words", lambda v: feats["words"] <= v),
+        ("min_specificity", lambda v: feats["specificity"] >= v),
+        ("max_specificity", lambda v: feats["specificity"] <= v),
+        ("min_follow_ups", lambda v: feats["follow_ups"] >= v),
+        ("max_follow_ups", lambda v: feats["follow_ups"] <= v),
+        ("has_coverage", lambda v: feats["has_coverage"] == v),
+    )
+    return all(check(rule[key]) for key, check in checks if key in rule)
+
+
+def _route(rules: list[dict[str, Any]], feats: dict[str, Any], model: str, max_tokens: int) -> Route:
+    if settings.model_routing_enabled:
+        for rule in rules:
+            if _matches(rule, feats):
+                return Route(
+                    rule.get("name", "rule"),
+                    rule.get("model") or model,
+                    int(rule.get("max_tokens") or max_tokens),
+                )
+    return Route("default", model, max_tokens)
+
+
+def route_analysis(response: str, follow_up_count: int, has_coverage: bool) -> Route:
+    feats = features(response, follow_up_count, has_coverage)
+    return _route(settings.analysis_routing_rules, feats, settings.openai_vagueness_model, 600)
+
+
+def route_extraction(full_response: str) -> Route:
+    return _route(settings.extraction_routing_rules, features(full_response), settings.openai_extraction_model, 512)
+
+
+# ── Per-route counters ───────────────────────────────────────────────────
+
+_lock = threading.Lock()
+_routes: dict[str, dict[str, Any]] = {}
+
+
+def record(endpoint: str, route: Route, latency_s: float, ok: bool = True, outcome: str | None = None):
+    """Count one routed call. `outcome` is a quality signal (analysis status or extraction specificity)."""
+    key = f"{endpoint}:{route.name}"
+    with _lock:
+        stats = _routes.setdefault(key, {
+            "model": route.model,
+            "max_tokens": route.max_tokens,
+            "calls": 0,
+            "failures": 0,
+            "outcomes": {},
+            "_latencies": deque(maxlen=500),
+        })
+        stats["model"] = route.model
+        stats["calls"] += 1
+        if not ok:
+            stats["failures"] += 1
+        if outcome:
+            stats["outcomes"][outcome] = stats["outcomes"].get(outcome, 0) + 1
+        stats["_latencies"].append(latency_s)
+
+
+def get_stats() -> dict[str, Any]:
+    out = {}
+    with _lock:
+        for key, stats in _routes.items():
+            samples = sorted(stats["_latencies"])
+            out[key] = {
+                **{k: v for k, v in stats.items() if not k.startswith("_")},
+                "outcomes": dict(stats["outcomes"]),
+                "failure_rate": round(stats["failures"] / stats["calls"], 4) if stats["calls"] else 0.0,
+                "latency_ms_p50": round(samples[len(samples) // 2] * 1000, 1) if samples else 0.0,
+                "latency_ms_p95": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))] * 1000, 1) if samples else 0.0,
+            }
+    return {"enabled": settings.model_routing_enabled, "routes": out}
@@ -4,22 +4,28 @@ import io
 import json
 import logging
 import re
-from typing import Any
+import time
+from typing import TYPE_CHECKING, Any
 
-from openai import OpenAI
+from pydantic import ValidationError
 
 from config import settings
+from schemas import ExtractionResult
+from services import exemplars, model_router, usage_ledger
 from prompts import (
     STRUCTURED_EXTRACTION_SYSTEM,
     STRUCTURED_EXTRACTION_USER_TEMPLATE,
 )
 
+if TYPE_CHECKING:
+    from openai import OpenAI
+
 logger = logging.getLogger(__name__)
 
 _client = None
 
 
-def get_client() -> OpenAI:
+def get_client() -> "OpenAI":
     global _client
     if _client is not None:
         return _client
@@ -29,6 +35,8 @@ def get_client() -> OpenAI:
             "OPENAI_API_KEY is not set. "
             "Please add it to backend/.env — see backend/.env.example"
         )
+    from openai import OpenAI
+
     _client = OpenAI(api_key=key)
     logger.info("OpenAI client initialized (key ending …%s)", key[-4:])
     return _client
@@ -41,6 +49,11 @@ def _clean_json(text: str) -> str:
     return text.strip()
 
 
+def warm_client():
+    """Create the OpenAI client and open a pooled connection ahead of the first request."""
+    get_client().models.retrieve(settings.openai_extraction_model)
+
+
 def transcribe_audio(audio_bytes: bytes, filename: str = "audio.webm") -> str:
     client = get_client()
     buf = io.BytesIO(audio_bytes)
@@ -71,22 +84,118 @@ def text_to_speech(text: str) -> str:
     return base64.b64encode(audio_bytes).decode("utf-8")
 
 
-def extract_structured(main_question: str, full_response: str) -> dict[str, Any]:
-    client = get_client()
-    user_msg = STRUCTURED_EXTRACTION_USER_TEMPLATE.format(
+def extract_structured(
+    main_question: str,
+    full_response: str,
+    session_id: str | None = None,
+    question_idx: int | None = None,
+    survey_id: str | None = None,
+) -> dict[str, Any]:
+    """
+    Structured impact data for one question. With the exemplar index enabled, the cheaper
+    exemplar model is prompted with the nearest curated extractions from the same survey as
+    few-shot examples; otherwise the model router picks model and max_tokens from the response itself.
+    """
+    shots = []
+    if settings.extraction_exemplars_enabled:
+        shots = exemplars.nearest(full_response, question_idx, settings.extraction_exemplar_k, survey_id=survey_id)
+    if shots:
+        route = model_router.Route("fewshot", settings.extraction_exemplar_model, 512)
+        endpoint = "extraction.fewshot"
+    else:
+        route = model_router.route_extraction(full_response)
+        endpoint = "extraction"
+
+    start = time.perf_counter()
+    try:
+        result = run_extraction(
+            main_question, full_response,
+            model=route.model,
+            max_tokens=route.max_tokens,
+            shots=shots,
+            endpoint=endpoint,
+            session_id=session_id,
+        )
+    except Exception:
+        model_router.record("extraction", route, time.perf_counter() - start, ok=False)
+        raise
+    model_router.record("extraction", route, time.perf_counter() - start, outcome=result.get("specificity_level"))
+    return result
+
+
+def is_output_failure(exc: BaseException) -> bool:
+    """Schema or finish-reason errors the SDK raises itself when parsing structured output."""
+    from openai import ContentFilterFinishReasonError, LengthFinishReasonError
+
+    return isinstance(exc, (ValidationError, LengthFinishReasonError, ContentFilterFinishReasonError))
+
+
+def _json_completion(client, schema, request: dict[str, Any], endpoint: str, session_id: str | None):
+    """
+    One JSON-mode completion. With structured outputs the SDK validates against `schema` and
+    raises on a miss; those failures are counted here so they are never silent.
+    """
+    start = time.perf_counter()
+    try:
+        if settings.structured_outputs_enabled:
+            resp = client.chat.completions.parse(response_format=schema, **request)
+        else:
+            resp = client.chat.completions.create(response_format={"type": "json_object"}, **request)
+    except Exception as e:
+        if is_output_failure(e):
+            usage_ledger.record_parse_failure(endpoint)
+            # Truncated completions still used tokens.
+            if getattr(e, "completion", None) is not None:
+                usage_ledger.record_openai(endpoint, e.completion, time.perf_counter() - start, session_id)
+            logger.warning("%s output rejected by schema parsing: %s", endpoint, e)
+        raise
+    usage_ledger.record_openai(endpoint, resp, time.perf_counter() - start, session_id)
+    return resp
+
+
+def _extraction_user_message(main_question: str, full_response: str) -> str:
+    return STRUCTURED_EXTRACTION_USER_TEMPLATE.format(
         main_question=main_question,
         full_response=full_response or "(no response)",
     )
+
+
+def run_extraction(
+    main_question: str,
+    full_response: str,
+    model: str | None = None,
+    max_tokens: int = 512,
+    shots: list[dict[str, Any]] | None = None,
+    endpoint: str = "extraction",
+    session_id: str | None = None,
+) -> dict[str, Any]:
+    """One extraction call on `model` (default: the extraction model), optionally few-shot."""
+    client = get_client()
     logger.info("Extracting structured data for Q: %s", main_question[:40])
-    resp = client.chat.completions.create(
-        model=settings.openai_extraction_model,
-        messages=[
-            {"role": "system", "content": STRUCTURED_EXTRACTION_SYSTEM},
-            {"role": "user", "content": user_msg},
-        ],
-        response_format={"type": "json_object"},
-        max_tokens=512,
+    messages = [{"role": "system", "content": STRUCTURED_EXTRACTION_SYSTEM}]
+    # Exemplars go after the fixed system prompt as prior user/assistant turns.
+    for shot in shots or []:
+        messages.append({"role": "user", "content": _extraction_user_message(shot["question"], shot["input"])})
+        messages.append({"role": "assistant", "content": json.dumps(shot["output"])})
+    messages.append({"role": "user", "content": _extraction_user_message(main_question, full_response)})
+    request = dict(
+        model=model or settings.openai_extraction_model,
+        messages=messages,
+        max_tokens=max_tokens,
         temperature=0.2,
     )
-    text = _clean_json(resp.choices[0].message.content or "{}")
-    return json.loads(text)
+    resp = _json_completion(client, ExtractionResult, request, endpoint, session_id)
+
+    message = resp.choices[0].message
+    if getattr(message, "refusal", None):
+        usage_ledger.record_parse_failure(endpoint)
+        raise ValueError(f"Extraction refused: {message.refusal}")
+    text = _clean_json(message.content or "{}")
+    try:
+        return ExtractionResult.model_validate_json(text).model_dump()
+    except ValidationError as e:
+        # Keep whatever JSON we got, but make the schema miss visible.
+        usage_ledger.record_parse_failure(endpoint)
+        logger.warning("Extraction output failed schema validation (%d errors): %.200r", e.error_count(), text)
+        return json.loads(text)
+
@@ -0,0 +1,59 @@
+"""Per-session change notifications for WebSocket subscribers."""
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+_subscribers: dict[str, set[asyncio.Queue]] = {}
+_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+
+
+def subscribe(sid: str) -> asyncio.Queue:
+    """Register a subscriber; the queue receives a token whenever the session changes."""
+    global _loop
+    _loop = asyncio.get_running_loop()
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    with _lock:
+        _subscribers.setdefault(sid, set()).add(queue)
+    return queue
+
+
+def unsubscribe(sid: str, queue: asyncio.Queue):
+    with _lock:
+        subs = _subscribers.get(sid)
+        if subs is None:
+            return
+        subs.discard(queue)
+        if not subs:
+            _subscribers.pop(sid, None)
+
+
+def _signal(queues: list[asyncio.Queue]):
+    for queue in queues:
+        try:
+            queue.put_nowait(True)
+        except asyncio.QueueFull:
+            pass  # a push is already pending; it will read the latest state
+
+
+def notify(sid: str):
+    """Wake subscribers of `sid`. Safe to call from worker threads."""
+    with _lock:
+        queues = list(_subscribers.get(sid, ()))
+    if not queues or _loop is None or _loop.is_closed():
+        return
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is _loop:
+        _signal(queues)
+    else:
+        _loop.call_soon_threadsafe(_signal, queues)
+
+
+def subscriber_count() -> int:
+    with _lock:
+        return sum(len(s) for s in _subscribers.values())
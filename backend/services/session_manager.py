@@ -1,31 +1,47 @@
 """Session manager: LangChain + ChromaDB for context-aware conversation."""
+import asyncio
 import json
 import logging
 import re
+import threading
 import time
 import uuid
-from pathlib import Path
+from collections import deque
 from typing import Any
 
-import chromadb
-from chromadb.utils.embedding_functions import OpenAIEmbeddingFunction
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain_openai import ChatOpenAI
-
 from config import settings
-from prompts import (
-    CONTEXT_ANALYSIS_SYSTEM,
-    CONTEXT_ANALYSIS_USER,
-    MAIN_QUESTIONS,
+from pydantic import ValidationError
+
+from prompts import CONTEXT_ANALYSIS_USER
+from schemas import AnalysisResult, CompactAnalysisResult, CompactFusedAnalysisResult, FusedAnalysisResult
+from services import (
+    model_router,
+    openai_service,
+    session_hub,
+    session_store,
+    survey_registry,
+    usage_ledger,
+    vector_store,
 )
+from services.executors import background_pool, run_hedged, run_vector, submit_vector
 
 logger = logging.getLogger(__name__)
 
 _sessions: dict[str, dict[str, Any]] = {}
 
-CHROMA_DIR = Path(__file__).resolve().parent.parent / "chroma_data"
-_chroma_client = None
-_collection = None
+# Hedged analysis state: recent end-to-end latencies drive the adaptive deadline.
+_analysis_latencies: deque[float] = deque(maxlen=500)
+_hedge_lock = threading.Lock()
+_hedge_stats = {
+    "calls": 0,
+    "hedged": 0,
+    "primary_wins": 0,
+    "hedge_wins": 0,
+    "failures": 0,
+}
+
+# Coverage precomputation: batched similarity queries vs. per-call fallbacks.
+_coverage_stats = {"batch_queries": 0, "batched_questions": 0, "batch_ms_total": 0.0, "memory_hits": 0, "single_queries": 0}
 
 _TERMINAL_REPLIES = {
     "nothing",
@@ -40,72 +56,222 @@ _TERMINAL_REPLIES = {
 }
 
 
-def _infer_future_coverage_from_text(q_idx: int, full_context: str, latest_response: str) -> list[int]:
+def _infer_future_coverage_from_text(
+    survey: survey_registry.Survey, q_idx: int, full_context: str, latest_response: str,
+) -> list[int]:
     """
     Heuristic coverage detection to complement LLM output.
     Helps skip later questions when earlier answers already include those details.
     """
-    text = _normalize_text(f"{full_context}\n{latest_response}")
-    covered: set[int] = set()
+    return survey.infer_future_coverage(q_idx, _normalize_text(f"{full_context}\n{latest_response}"))
+
+
+def session_survey(sid: str | None) -> survey_registry.Survey:
+    """The survey a session runs; sessions saved before surveys existed use the default."""
+    session = _sessions.get(sid) if sid else None
+    try:
+        return survey_registry.get_survey(session.get("survey_id") if session else None)
+    except survey_registry.UnknownSurvey:
+        return survey_registry.get_survey()
+
+
+def _get_collection(sid: str | None = None):
+    """Chroma collection for a session: its time shard, or the current shard when unknown."""
+    return vector_store.get_collection(_shard_name(sid))
 
-    outcome_markers = [
-        "outcome", "result", "impact", "changed", "improved",
-        "save time", "saved time", "faster", "quicker", "reduced time",
-        "team responded", "team reaction", "they were happy",
-    ]
-    barrier_markers = [
-        "difficult", "difficulty", "barrier", "constraint", "challenge",
-        "could not", "couldnt", "can't", "cant", "need help",
-        "support", "colleague", "colleagues", "competing priorities",
-    ]
 
-    # If on Q1 and the response already includes outcomes/barriers, mark Q2/Q3 covered.
-    if q_idx == 0:
-        if any(m in text for m in outcome_markers):
-            covered.add(1)
-        if any(m in text for m in barrier_markers):
-            covered.add(2)
+def _shard_name(sid: str | None) -> str:
+    session = _sessions.get(sid) if sid else None
+    return vector_store.shard_for(session.get("created_at") if session else None)
 
-    # If on Q2 and barriers are already present, mark Q3 covered.
-    if q_idx == 1:
-        if any(m in text for m in barrier_markers):
-            covered.add(2)
 
-    return sorted(list(covered))
+def _question_embedding(survey: survey_registry.Survey, q_idx: int) -> list[float] | None:
+    """Precompiled embedding of a survey question, or None if embeddings are unavailable."""
+    if survey.question_embeddings is None:
+        survey_registry.warm_embeddings(vector_store.get_embedding_function())
+    vectors = survey.question_embeddings
+    return vectors[q_idx] if vectors and 0 <= q_idx < len(vectors) else None
 
 
-def _get_collection():
-    global _chroma_client, _collection
-    if _collection is not None:
-        return _collection
+def warm_vector_store() -> bool:
+    """Open the Chroma collection and precompute question embeddings for every survey."""
+    if _get_collection() is None:
+        return False
+    return survey_registry.warm_embeddings(vector_store.get_embedding_function())
+
+
+def warm_llm_client():
+    """Import LangChain and open a pooled connection to the chat completions API."""
+    from langchain_core.messages import HumanMessage  # noqa: F401
+
+    llm = _analysis_llm(settings.openai_vagueness_model)
+    llm.root_client.models.retrieve(settings.openai_vagueness_model)
+    if settings.analysis_hedge_enabled:
+        # Hedged calls stream on the async client; start its loop and connection pool now too.
+        run_hedged(llm.root_async_client.models.retrieve(settings.openai_vagueness_model))
+
+
+def _store_document(doc_id: str, text: str, metadata: dict[str, Any]):
+    """Embed and store one participant turn. Runs on the vector-store pool."""
+    sid = metadata.get("session_id")
+    coll = _get_collection(sid)
+    if not coll:
+        return
     try:
-        key = settings.openai_api_key.strip().strip('"').strip("'")
-        embed_fn = OpenAIEmbeddingFunction(
-            api_key=key,
-            model_name="text-embedding-3-small",
-        )
-        _chroma_client = chromadb.PersistentClient(path=str(CHROMA_DIR))
-        _collection = _chroma_client.get_or_create_collection(
-            name="session_responses",
-            embedding_function=embed_fn,
-        )
-        logger.info("ChromaDB ready at %s", CHROMA_DIR)
+        with vector_store.shard_lock(_shard_name(sid)):
+            coll.add(documents=[text], metadatas=[{**metadata, "ts": time.time()}], ids=[doc_id])
     except Exception as e:
-        logger.warning("ChromaDB init failed (non-critical): %s", e)
-    return _collection
+        logger.warning("ChromaDB store failed: %s", e)
+        return
+    if settings.coverage_precompute_enabled:
+        _refresh_similar(sid)
 
 
-def create_session() -> str:
-    sid = uuid.uuid4().hex[:12]
-    _sessions[sid] = {
-        "created_at": time.time(),
+def _completed_session_shards() -> list[tuple[str, str]]:
+    """(session_id, shard) for check-ins whose questions are all completed or covered."""
+    out = []
+    for sid, session in list(_sessions.items()):
+        done = set(session.get("completed_qs", set())) | set(session.get("covered_ahead", set()))
+        if len(done) >= len(session_survey(sid).questions) and not session.get("vectors_released"):
+            out.append((sid, _shard_name(sid)))
+    return out
+
+
+def _vectors_released(sid: str):
+    """Called by maintenance once a completed session's vectors are deleted, so it is not retried."""
+    session = _sessions.get(sid)
+    if session is not None:
+        session["vectors_released"] = True
+        session_store.mark_dirty(sid)
+
+
+def start_vector_maintenance():
+    vector_store.start_maintenance(
+        lambda job: submit_vector(job),
+        _completed_session_shards,
+        _vectors_released,
+    )
+
+
+def _touch(sid: str):
+    """Record that a session changed: schedule a snapshot and wake live subscribers."""
+    session_store.mark_dirty(sid)
+    session_hub.notify(sid)
+
+
+# ── Event log ───────────────────────────────────────────────────────────
+#
+# Every mutation is an event appended to session["events"] under the session's lock and
+# stamped with the next sequence number. Everything else on the session (entries, pending
+# follow-up, progress, coverage, context lines) is derived state, updated incrementally by
+# _apply_event as each event lands and rebuilt by replaying the log after a restart.
+#
+# Event types:
+#   response   {question_idx, question, response, analysis}   text-mode answer
+#   turn       {question_idx, role, text}                     voice / follow-up turn
+#   pending    {question_idx, text}                            pending follow-up ("" clears)
+#   completed  {question_idx}
+#   covered    {indices, evidence}
+#   finalize   {}                                              end-of-session extraction requested
+#   extracted  {results, through}                              extraction stored; saw answers up to seq `through`
+#   finalize_failed {error}                                    one failed extraction attempt
+
+def _new_session(created_at: float, survey_id: str) -> dict[str, Any]:
+    return {
+        "created_at": created_at,
+        "survey_id": survey_id,
+        "seq": 0,
+        "events": [],
         "entries": [],
         "completed_qs": set(),
         "covered_ahead": set(),
         "covered_evidence": {},
         "pending_follow_up": None,
+        "finalization": None,
+        "_context": [],
+        # Nearest stored turns per question, refreshed by one batched query after each stored turn.
+        "_similar": {},
+        "_similar_seq": 0,
+        "_lock": threading.Lock(),
     }
-    logger.info("Session created: %s", sid)
+
+
+def _apply_event(session: dict[str, Any], event: dict[str, Any]):
+    kind = event["type"]
+    q_idx = event.get("question_idx")
+    if kind == "response":
+        session["entries"].append(event)
+        session["_context"].append(f"[Q{q_idx+1}] {event['question']}\nParticipant: {event['response']}")
+    elif kind == "turn":
+        session["entries"].append(event)
+        label = "AI" if event["role"] == "ai" else "Participant"
+        session["_context"].append(f"[Q{q_idx+1}] {label}: {event['text']}")
+    elif kind == "pending":
+        text = event.get("text") or ""
+        session["pending_follow_up"] = {"question_idx": q_idx, "text": text, "ts": event["ts"]} if text else None
+    elif kind == "completed":
+        session["completed_qs"].add(q_idx)
+    elif kind == "covered":
+        session["covered_ahead"].update(event["indices"])
+        if event.get("evidence"):
+            for idx in event["indices"]:
+                session["covered_evidence"].setdefault(idx, event["evidence"])
+    elif kind == "finalize":
+        # A re-run keeps the previous results visible until the new ones land.
+        prev = session["finalization"] or {}
+        session["finalization"] = {
+            "status": "pending", "attempts": 0, "results": prev.get("results"), "error": None,
+            "through": prev.get("through", 0),
+        }
+    elif kind == "extracted" and session["finalization"]:
+        session["finalization"].update(status="done", results=event["results"], error=None, through=event["through"])
+    elif kind == "finalize_failed" and session["finalization"]:
+        fin = session["finalization"]
+        fin["attempts"] += 1
+        fin["error"] = event.get("error")
+        if fin["attempts"] >= settings.session_finalize_max_attempts:
+            fin["status"] = "failed"
+    session["seq"] = max(session["seq"], event["seq"])
+
+
+def _append(sid: str, kind: str, when=None, **fields) -> dict[str, Any] | None:
+    """
+    Append one event to a session's log and apply it. `when(session)` is checked under the
+    lock, so read-then-write updates (e.g. clearing only a matching follow-up) stay atomic.
+    """
+    session = _sessions.get(sid)
+    if not session:
+        return None
+    with session["_lock"]:
+        if when is not None and not when(session):
+            return None
+        event = {"seq": session["seq"] + 1, "type": kind, "ts": time.time(), **fields}
+        session["events"].append(event)
+        _apply_event(session, event)
+    _touch(sid)
+    return event
+
+
+def _rebuild_session(state: dict[str, Any]) -> dict[str, Any]:
+    """Replay a persisted event log into a live session with its derived state."""
+    events = state["events"]
+    session = _new_session(state.get("created_at", 0), state.get("survey_id") or settings.default_survey_id)
+    for key, value in state.items():
+        if key not in session and key not in session_store.DERIVED_FIELDS:
+            session[key] = value  # e.g. vectors_released
+    for event in events:
+        session["events"].append(event)
+        _apply_event(session, event)
+    return session
+
+
+def create_session(survey_id: str | None = None) -> str:
+    """Start a check-in on `survey_id` (default survey if None); raises UnknownSurvey."""
+    survey = survey_registry.get_survey(survey_id)
+    sid = uuid.uuid4().hex[:12]
+    _sessions[sid] = _new_session(time.time(), survey.id)
+    _touch(sid)
+    logger.info("Session created: %s (survey %s)", sid, survey.id)
     return sid
 
 
@@ -113,93 +279,127 @@ def get_session(sid: str) -> dict | None:
     return _sessions.get(sid)
 
 
+def restore_sessions() -> int:
+    """Reload sessions saved before the last restart and start periodic snapshots."""
+    if not settings.session_snapshot_enabled:
+        return 0
+    if not session_store.acquire():
+        logger.error(
+            "Session snapshots disabled for this process: %s is in use by another worker. "
+            "Give each worker its own SESSION_SNAPSHOT_DIR.", session_store.SNAPSHOT_DIR,
+        )
+        return 0
+    start = time.perf_counter()
+    restored = session_store.load(_sessions, _rebuild_session)
+    session_store.start(_sessions)
+    logger.info("Restored %d session(s) in %.1fms", restored, (time.perf_counter() - start) * 1000)
+    resume_finalizations()
+    return restored
+
+
 def add_response(sid: str, q_idx: int, response: str, analysis: dict | None = None):
-    session = _sessions.get(sid)
-    if not session:
+    survey = session_survey(sid)
+    event = _append(
+        sid, "response",
+        question_idx=q_idx,
+        question=survey.question(q_idx),
+        response=response,
+        # Copied: the caller keeps adjusting its dict, and logged events must not change.
+        analysis=dict(analysis) if analysis is not None else None,
+    )
+    if event is None:
         return
+    _maybe_finalize(sid)
 
-    entry = {
+    # Sequence numbers are unique per session, so concurrent writers cannot collide on ids.
+    doc_id = f"{sid}_{q_idx}_{event['seq']}"
+    submit_vector(_store_document, doc_id, response, {
+        "session_id": sid,
+        "survey_id": survey.id,
         "question_idx": q_idx,
-        "question": MAIN_QUESTIONS[q_idx] if q_idx < len(MAIN_QUESTIONS) else "",
-        "response": response,
-        "analysis": analysis,
-        "ts": time.time(),
-    }
-    session["entries"].append(entry)
-
-    coll = _get_collection()
-    if coll:
-        try:
-            doc_id = f"{sid}_{q_idx}_{len(session['entries'])}"
-            coll.add(
-                documents=[response],
-                metadatas=[{
-                    "session_id": sid,
-                    "question_idx": q_idx,
-                    "question": entry["question"],
-                }],
-                ids=[doc_id],
-            )
-        except Exception as e:
-            logger.warning("ChromaDB store failed: %s", e)
+        "question": event["question"],
+    })
 
 
 def add_voice_turn(sid: str, q_idx: int, role: str, text: str):
     """Append a voice conversation turn (user or ai) to the session history."""
-    session = _sessions.get(sid)
-    if not session or not text:
+    if not text:
         return
-
-    entry = {
-        "question_idx": q_idx,
-        "role": role,
-        "text": text,
-        "ts": time.time(),
-    }
-    session["entries"].append(entry)
+    event = _append(sid, "turn", question_idx=q_idx, role=role, text=text)
+    if event is None:
+        return
+    _maybe_finalize(sid)
 
     if role == "user":
-        coll = _get_collection()
-        if coll:
-            try:
-                doc_id = f"{sid}_v_{q_idx}_{len(session['entries'])}"
-                coll.add(
-                    documents=[text],
-                    metadatas=[{
-                        "session_id": sid,
-                        "question_idx": q_idx,
-                        "question": MAIN_QUESTIONS[q_idx] if q_idx < len(MAIN_QUESTIONS) else "",
-                    }],
-                    ids=[doc_id],
-                )
-            except Exception as e:
-                logger.warning("ChromaDB voice store failed: %s", e)
+        doc_id = f"{sid}_v_{q_idx}_{event['seq']}"
+        survey = session_survey(sid)
+        submit_vector(_store_document, doc_id, text, {
+            "session_id": sid,
+            "survey_id": survey.id,
+            "question_idx": q_idx,
+            "question": survey.question(q_idx),
+        })
 
 
 def set_pending_follow_up(sid: str, q_idx: int, follow_up_text: str):
-    session = _sessions.get(sid)
-    if not session:
-        return
-    cleaned = (follow_up_text or "").strip()
-    if not cleaned:
-        session["pending_follow_up"] = None
-        return
-    session["pending_follow_up"] = {
-        "question_idx": q_idx,
-        "text": cleaned,
-        "ts": time.time(),
-    }
+    _append(sid, "pending", question_idx=q_idx, text=(follow_up_text or "").strip())
 
 
 def clear_pending_follow_up(sid: str, q_idx: int | None = None):
+    def matches(session: dict[str, Any]) -> bool:
+        pending = session.get("pending_follow_up")
+        return bool(pending) and (q_idx is None or pending.get("question_idx") == q_idx)
+
+    _append(sid, "pending", when=matches, question_idx=q_idx, text="")
+
+
+def mark_question_completed(sid: str, q_idx: int):
+    if not 0 <= q_idx < len(session_survey(sid).questions):
+        return
+    if _append(sid, "completed", when=lambda s: q_idx not in s["completed_qs"], question_idx=q_idx):
+        _maybe_finalize(sid)
+
+
+def mark_questions_covered(sid: str, indices: list[int], evidence: str):
+    """Record later questions the participant has already answered, with the supporting text."""
+    evidence = (evidence or "").strip()
+    _append(
+        sid, "covered",
+        when=lambda s: not set(indices) <= s["covered_ahead"]
+        or bool(evidence) and any(i not in s["covered_evidence"] for i in indices),
+        indices=sorted(indices),
+        evidence=evidence,
+    )
+
+
+def get_session_state(sid: str) -> dict[str, Any] | None:
+    """Client-facing view of coverage, pending follow-up and progress (memory only)."""
     session = _sessions.get(sid)
     if not session:
-        return
-    pending = session.get("pending_follow_up")
-    if not pending:
-        return
-    if q_idx is None or pending.get("question_idx") == q_idx:
-        session["pending_follow_up"] = None
+        return None
+    with session["_lock"]:
+        covered = set(session["covered_ahead"])
+        evidence_map = dict(session["covered_evidence"])
+        pending = session["pending_follow_up"]
+        completed = sorted(session["completed_qs"])
+        seq = session["seq"]
+        turns = len(session["entries"])
+        finalization = (session["finalization"] or {}).get("status")
+    return {
+        "coverage": [
+            {
+                "question_index": i,
+                "covered": i in covered,
+                "evidence": (evidence_map.get(i) or "").strip(),
+            }
+            for i in range(len(session_survey(sid).questions))
+        ],
+        "pending_follow_up": dict(pending) if isinstance(pending, dict) else None,
+        "completed_questions": completed,
+        "turns": turns,
+        "seq": seq,
+        "finalization": finalization,
+    }
 
 
 def get_pending_follow_up(sid: str) -> dict[str, Any] | None:
@@ -214,33 +414,79 @@ def build_context_text(sid: str) -> str:
     session = _sessions.get(sid)
     if not session:
         return "(no prior conversation)"
-    parts = []
-    for e in session["entries"]:
-        if "role" in e:
-            label = "AI" if e["role"] == "ai" else "Participant"
-            parts.append(f"[Q{e['question_idx']+1}] {label}: {e['text']}")
-        else:
-            parts.append(f"[Q{e['question_idx']+1}] {e['question']}\nParticipant: {e['response']}")
-    return "\n".join(parts) if parts else "(no prior conversation)"
+    with session["_lock"]:
+        return "\n".join(session["_context"]) if session["_context"] else "(no prior conversation)"
 
 
 def check_already_covered(sid: str, q_idx: int) -> list[str]:
-    """Use ChromaDB similarity search to find if this question was already addressed."""
-    coll = _get_collection()
-    if not coll:
-        return []
+    """Stored turns most similar to this question: precomputed in memory, else one ChromaDB query."""
+    session = _sessions.get(sid)
+    if session is not None:
+        with session["_lock"]:
+            similar = session["_similar"].get(q_idx)
+        if similar is not None:
+            _coverage_stats["memory_hits"] += 1
+            return list(similar)
+    _coverage_stats["single_queries"] += 1
+    return run_vector(_query_covered, sid, [q_idx]).get(q_idx, [])
+
+
+def _query_covered(sid: str, indices: list[int]) -> dict[int, list[str]]:
+    """Nearest stored turns of this session for each question in `indices`, in one query."""
+    coll = _get_collection(sid)
+    if not coll or not indices:
+        return {}
     try:
-        q_text = MAIN_QUESTIONS[q_idx] if q_idx < len(MAIN_QUESTIONS) else ""
+        survey = session_survey(sid)
+        vectors = [_question_embedding(survey, i) for i in indices]
+        if all(v is not None for v in vectors):
+            query = {"query_embeddings": vectors}
+        else:
+            query = {"query_texts": [survey.question(i) for i in indices]}
         results = coll.query(
-            query_texts=[q_text],
+            **query,
             n_results=5,
             where={"session_id": sid},
         )
-        if results and results["documents"] and results["documents"][0]:
-            return results["documents"][0]
+        documents = (results or {}).get("documents") or []
+        return {i: list(docs or []) for i, docs in zip(indices, documents)}
     except Exception as e:
         logger.warning("ChromaDB query failed: %s", e)
-    return []
+    return {}
+
+
+def _refresh_similar(sid: str):
+    """Recompute similar turns for every unanswered question after a turn is stored (vector pool)."""
+    session = _sessions.get(sid)
+    if not session:
+        return
+    with session["_lock"]:
+        done = session["completed_qs"] | session["covered_ahead"]
+        seq = session["seq"]
+    remaining = [i for i in range(len(session_survey(sid).questions)) if i not in done]
+    if not remaining:
+        return
+    start = time.perf_counter()
+    similar = _query_covered(sid, remaining)
+    if not similar:
+        return
+    _coverage_stats["batch_queries"] += 1
+    _coverage_stats["batched_questions"] += len(similar)
+    _coverage_stats["batch_ms_total"] += (time.perf_counter() - start) * 1000
+    with session["_lock"]:
+        # Turns stored concurrently may finish out of order; keep the newest view.
+        if seq >= session["_similar_seq"]:
+            session["_similar"].update(similar)
+            session["_similar_seq"] = seq
+
+
+def get_coverage_stats() -> dict[str, Any]:
+    batches = _coverage_stats["batch_queries"]
+    return {
+        "enabled": settings.coverage_precompute_enabled,
+        **{k: v for k, v in _coverage_stats.items() if k != "batch_ms_total"},
+        "avg_batch_ms": round(_coverage_stats["batch_ms_total"] / batches, 1) if batches else 0.0,
+    }
 
 
 def _clean_json(text: str) -> str:
@@ -293,6 +539,148 @@ def _recent_question_entries(sid: str, q_idx: int) -> tuple[list[str], list[str]
     return user_texts[-3:], ai_texts[-3:]
 
 
+def _analysis_llm(model: str, max_tokens: int = 600):
+    from langchain_openai import ChatOpenAI
+
+    key = settings.openai_api_key.strip().strip('"').strip("'")
+    return ChatOpenAI(
+        model=model,
+        api_key=key,
+        temperature=0.3,
+        max_tokens=max_tokens,
+        stream_usage=True,
+    )
+
+
+def _percentile(samples: list[float], q: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    idx = min(len(ordered) - 1, max(0, int(round(q * (len(ordered) - 1)))))
+    return ordered[idx]
+
+
+def _hedge_deadline_s() -> float:
+    """Fixed deadline until enough samples exist, then the observed percentile."""
+    fixed = max(0, settings.analysis_hedge_deadline_ms) / 1000
+    q = settings.analysis_hedge_percentile
+    with _hedge_lock:
+        samples = list(_analysis_latencies)
+    if q <= 0 or len(samples) < max(1, settings.analysis_hedge_min_samples):
+        return fixed
+    return _percentile(samples, min(q, 1.0))
+
+
+async def _stream_content(llm, messages: list, **kwargs):
+    """Stream a completion; cancelling the task aborts the HTTP response, even before the first token."""
+    message = None
+    async for chunk in llm.astream(messages, **kwargs):
+        message = chunk if message is None else message + chunk
+    if message is None:
+        raise RuntimeError("Empty analysis stream")
+    return message
+
+
+async def _race(llm, messages: list, **kwargs):
+    """Race the primary call against a deadline-triggered hedge; cancel the loser."""
+    primary = asyncio.create_task(_stream_content(llm, messages, **kwargs))
+    done, _ = await asyncio.wait({primary}, timeout=_hedge_deadline_s())
+    if done:
+        message = primary.result()
+        with _hedge_lock:
+            _hedge_stats["primary_wins"] += 1
+        return message
+
+    fallback_model = settings.analysis_hedge_fallback_model.strip() or settings.openai_vagueness_model
+    hedge = asyncio.create_task(_stream_content(_analysis_llm(fallback_model, llm.max_tokens), messages, **kwargs))
+    with _hedge_lock:
+        _hedge_stats["hedged"] += 1
+    logger.info("Analysis hedged after deadline (fallback model=%s)", fallback_model)
+
+    attempts = {primary: "primary_wins", hedge: "hedge_wins"}
+    pending = set(attempts)
+    error: BaseException | None = None
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    error = task.exception()
+                    continue
+                with _hedge_lock:
+                    _hedge_stats[attempts[task]] += 1
+                return task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+    raise error if error else RuntimeError("Hedged analysis produced no result")
+
+
+def _hedged_invoke(llm, messages: list, **kwargs):
+    return run_hedged(_race(llm, messages, **kwargs))
+
+
+def _invoke_analysis(llm, messages: list, sid: str | None = None, endpoint: str = "analysis", **kwargs) -> str:
+    start = time.perf_counter()
+    with _hedge_lock:
+        _hedge_stats["calls"] += 1
+    try:
+        if settings.analysis_hedge_enabled:
+            message = _hedged_invoke(llm, messages, **kwargs)
+        else:
+            message = llm.invoke(messages, **kwargs)
+    except Exception:
+        with _hedge_lock:
+            _hedge_stats["failures"] += 1
+        raise
+    elapsed = time.perf_counter() - start
+    with _hedge_lock:
+        _analysis_latencies.append(elapsed)
+    usage_ledger.record_langchain(endpoint, llm.model_name, message, elapsed, sid)
+    return message.content
+
+
+def _parse_analysis(content: str, schema: type[AnalysisResult] | type[CompactAnalysisResult], endpoint: str) -> dict[str, Any]:
+    """Validate the model output against its schema; failures are logged and counted, never silent."""
+    try:
+        return schema.model_validate_json(_clean_json(content)).to_dict()
+    except ValidationError as e:
+        usage_ledger.record_parse_failure(endpoint)
+        logger.warning("Analysis output failed schema validation (%d errors): %.200r", e.error_count(), content)
+        raise
+
+
+def get_hedge_stats() -> dict[str, Any]:
+    """Hedge rate and win rate for tuning the cost versus tail-latency tradeoff."""
+    with _hedge_lock:
+        stats = dict(_hedge_stats)
+        samples = list(_analysis_latencies)
+    calls = stats["calls"]
+    hedged = stats["hedged"]
+    return {
+        **stats,
+        "enabled": settings.analysis_hedge_enabled,
+        "fallback_model": settings.analysis_hedge_fallback_model or settings.openai_vagueness_model,
+        "hedge_rate": round(hedged / calls, 4) if calls else 0.0,
+        "hedge_win_rate": round(stats["hedge_wins"] / hedged, 4) if hedged else 0.0,
+        "deadline_ms": round(_hedge_deadline_s() * 1000, 1),
+        "latency_ms": {
+            "samples": len(samples),
+            "p50": round(_percentile(samples, 0.5) * 1000, 1),
+            "p90": round(_percentile(samples, 0.9) * 1000, 1),
+            "p99": round(_percentile(samples, 0.99) * 1000, 1),
+        },
+    }
+
+
+_ANALYSIS_SCHEMAS = {
+    (False, False): AnalysisResult,
+    (True, False): CompactAnalysisResult,
+    (False, True): FusedAnalysisResult,
+    (True, True): CompactFusedAnalysisResult,
+}
+
+
 def analyze_response(
     sid: str,
     q_idx: int,
@@ -300,38 +688,52 @@ def analyze_response(
     follow_up_count: int,
 ) -> dict[str, Any]:
     """Context-aware analysis using LangChain with full session memory."""
+    survey = session_survey(sid)
     full_context = build_context_text(sid)
-    current_q = MAIN_QUESTIONS[q_idx] if q_idx < len(MAIN_QUESTIONS) else ""
-    remaining = MAIN_QUESTIONS[q_idx + 1:] if q_idx + 1 < len(MAIN_QUESTIONS) else []
+    current_q = survey.question(q_idx)
+    remaining = survey.questions[q_idx + 1:]
 
     similar = check_already_covered(sid, q_idx)
 
-    key = settings.openai_api_key.strip().strip('"').strip("'")
-    llm = ChatOpenAI(
-        model=settings.openai_vagueness_model,
-        api_key=key,
-        temperature=0.3,
-        max_tokens=600,
-    )
+    session = _sessions.get(sid)
+    route = model_router.route_analysis(response, follow_up_count, bool(session and session["covered_ahead"]))
+    fused = settings.analysis_fused_extraction
+    # Room for the extraction object on top of the routed analysis budget.
+    llm = _analysis_llm(route.model, route.max_tokens + (250 if fused else 0))
 
     user_content = CONTEXT_ANALYSIS_USER.format(
         full_conversation=full_context,
         current_question=current_q,
         current_response=response,
         follow_up_count=follow_up_count,
-        max_follow_ups=2,
+        max_follow_ups=survey.max_follow_ups,
         remaining_questions=json.dumps(remaining) if remaining else "(none)",
         similar_past=json.dumps(similar[:3]) if similar else "(none)",
     )
 
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    compact = settings.analysis_compact_output
+    schema = _ANALYSIS_SCHEMAS[(compact, fused)]
+    endpoint = "analysis" + (".compact" if compact else "") + (".fused" if fused else "")
     messages = [
-        SystemMessage(content=CONTEXT_ANALYSIS_SYSTEM),
+        SystemMessage(content=survey.analysis_system(compact, fused)),
         HumanMessage(content=user_content),
     ]
+    call_kwargs = {"response_format": schema} if settings.structured_outputs_enabled else {}
 
+    start = time.perf_counter()
     try:
-        result = llm.invoke(messages)
-        parsed = json.loads(_clean_json(result.content))
+        try:
+            content = _invoke_analysis(llm, messages, sid, endpoint, **call_kwargs)
+        except Exception as e:
+            # With response_format the SDK validates (and raises) before _parse_analysis sees the output.
+            if openai_service.is_output_failure(e):
+                usage_ledger.record_parse_failure(endpoint)
+                logger.warning("Analysis output rejected by schema parsing: %s", e)
+            raise
+        parsed = _parse_analysis(content, schema, endpoint)
+        elapsed = time.perf_counter() - start
 
         # Server-side guardrails: prevent repetitive/interrogative follow-up loops.
         user_recent, ai_recent = _recent_question_entries(sid, q_idx)
@@ -362,39 +764,38 @@ def analyze_response(
                 parsed["follow_up"] = ""
                 parsed["reason"] = "Proposed follow-up repeats earlier AI prompt; move on."
 
-        # Q3 barrier rule: once a real barrier exists, allow only one clarifier.
-        if q_idx == 2 and follow_up_count >= 1 and parsed.get("status") == "needs_follow_up":
+        # Per-question clarifier cap (e.g. barriers): once a real answer exists, stop probing.
+        max_clarifiers = survey.max_clarifiers[q_idx] if q_idx < len(survey.max_clarifiers) else None
+        if (
+            max_clarifiers is not None
+            and follow_up_count >= max_clarifiers
+            and parsed.get("status") == "needs_follow_up"
+        ):
             parsed["status"] = "done"
             parsed["follow_up"] = ""
-            parsed["reason"] = "Barrier identified and one clarifier already asked; stop further probing."
+            parsed["reason"] = "Answer identified and clarifier limit for this question reached; stop further probing."
 
         # Merge heuristic coverage so already-answered later questions get skipped.
         llm_covered = parsed.get("covered_future_indices", []) or []
-        inferred_covered = _infer_future_coverage_from_text(q_idx, full_context, response)
+        inferred_covered = _infer_future_coverage_from_text(survey, q_idx, full_context, response)
         merged_covered = sorted(set(int(i) for i in llm_covered + inferred_covered if isinstance(i, int)))
         parsed["covered_future_indices"] = merged_covered
 
-        logger.info("Analysis for Q%d: status=%s, reason=%s",
-                     q_idx + 1, parsed.get("status"), parsed.get("reason", "")[:60])
+        logger.info("Analysis for Q%d: status=%s, reason=%s (route %s)",
+                     q_idx + 1, parsed.get("status"), parsed.get("reason", "")[:60], route.name)
+        model_router.record("analysis", route, elapsed, outcome=parsed.get("status"))
 
         add_response(sid, q_idx, response, parsed)
 
         covered = parsed.get("covered_future_indices", [])
         if covered:
-            session = _sessions.get(sid)
-            if session:
-                session["covered_ahead"].update(covered)
-                evidence_map = session.get("covered_evidence")
-                if isinstance(evidence_map, dict):
-                    evidence_text = (parsed.get("summary") or response or "").strip()
-                    for idx in covered:
-                        if idx not in evidence_map and evidence_text:
-                            evidence_map[idx] = evidence_text
+            mark_questions_covered(sid, covered, parsed.get("summary") or response)
 
         return parsed
 
     except Exception as e:
         logger.exception("LangChain analysis failed, falling back")
+        model_router.record("analysis", route, time.perf_counter() - start, ok=False)
         add_response(sid, q_idx, response, None)
         return {
             "status": "done",
@@ -431,3 +832,190 @@ def get_coverage_info(sid: str, q_idx: int) -> dict[str, Any]:
             evidence = (similar[0] or "").strip()
 
     return {"covered": covered, "evidence": evidence}
+
+
+# ── End-of-session extraction ───────────────────────────────────────────
+#
+# Once every question is completed (or the client reports the check-in complete), a
+# "finalize" event is appended and each question's full transcript is extracted on the
+# background pool through openai_service.extract_structured, so survey exemplars and model
+# routing apply. A question whose last answer already carries a fused-analysis extraction,
+# or that has not changed since the previous run, reuses that result instead of a call. Coverage alone never triggers it: heuristic coverage can mark later
+# questions answered while their turns are still arriving. The outcome is stored as an
+# "extracted" event recording the last participant entry it saw; an answer logged after that
+# re-queues extraction, so late answers and clarifications are never left out. Results and
+# unfinished jobs both survive a restart through the session snapshots.
+
+_finalize_stats = {
+    "requested": 0, "completed": 0, "failed_attempts": 0, "resumed": 0,
+    "extracted": 0, "reused_fused": 0, "reused_previous": 0, "extract_ms_total": 0.0,
+}
+
+
+def _question_transcripts(session: dict[str, Any], survey: survey_registry.Survey) -> list[dict[str, Any]]:
+    """
+    Per question: the full transcript, the seq of its last participant entry, and the fused
+    extraction of its last response if no participant turn came after it.
+    """
+    items = [
+        {"question_index": i, "question": survey.question(i), "lines": [], "seq": 0, "extraction": None}
+        for i in range(len(survey.questions))
+    ]
+    for entry in session["entries"]:
+        q_idx = entry.get("question_idx")
+        if not isinstance(q_idx, int) or not 0 <= q_idx < len(items):
+            continue
+        item = items[q_idx]
+        if entry["type"] == "response":
+            item["lines"].append(f"Participant: {entry['response']}")
+            item["seq"] = entry["seq"]
+            item["extraction"] = (entry.get("analysis") or {}).get("extraction")
+        else:
+            label = "AI" if entry["role"] == "ai" else "Participant"
+            item["lines"].append(f"{label}: {entry['text']}")
+            if entry["role"] == "user":
+                item["seq"] = entry["seq"]
+                item["extraction"] = None
+    for item in items:
+        item["transcript"] = "\n".join(item.pop("lines"))
+    return items
+
+
+def _extract_questions(
+    sid: str,
+    survey: survey_registry.Survey,
+    transcripts: list[dict[str, Any]],
+    previous: dict[int, dict[str, Any]],
+    through: int,
+) -> list[dict[str, Any]]:
+    results = []
+    for t in transcripts:
+        idx = t["question_index"]
+        if not t["transcript"]:
+            result = {}
+        elif t["extraction"] is not None:
+            result = t["extraction"]
+            _finalize_stats["reused_fused"] += 1
+        elif idx in previous and t["seq"] <= through:
+            result = previous[idx]
+            _finalize_stats["reused_previous"] += 1
+        else:
+            result = openai_service.extract_structured(t["question"], t["transcript"], sid, idx, survey.id)
+            _finalize_stats["extracted"] += 1
+        results.append({**result, "question_index": idx, "question": t["question"]})
+    return results
+
+
+def _last_answer_seq(session: dict[str, Any]) -> int:
+    """Seq of the latest participant entry; AI turns alone do not change what gets extracted."""
+    for entry in reversed(session["entries"]):
+        if entry["type"] == "response" or entry["role"] == "user":
+            return entry["seq"]
+    return 0
+
+
+def _is_stale(session: dict[str, Any]) -> bool:
+    """Extraction finished, but the participant answered again after the entries it saw."""
+    fin = session["finalization"]
+    return bool(fin) and fin["status"] == "done" and _last_answer_seq(session) > fin["through"]
+
+
+def _maybe_finalize(sid: str):
+    session = _sessions.get(sid)
+    if not session:
+        return
+    with session["_lock"]:
+        if session["finalization"] is None:
+            ready = session["completed_qs"] >= set(range(len(session_survey(sid).questions)))
+        else:
+            ready = _is_stale(session)
+    if ready:
+        finalize_session(sid)
+
+
+def finalize_session(sid: str) -> bool:
+    """
+    Queue end-of-session extraction: the first time, again after a failed run, or again when
+    new entries arrived after the last one. False for unknown sessions.
+    """
+    if sid not in _sessions:
+        return False
+    if not settings.session_finalize_enabled:
+        return True
+    def needed(session: dict[str, Any]) -> bool:
+        fin = session["finalization"]
+        return fin is None or fin["status"] == "failed" or _is_stale(session)
+
+    if _append(sid, "finalize", when=needed):
+        _finalize_stats["requested"] += 1
+        background_pool.submit(_run_finalization, sid)
+    return True
+
+
+def _run_finalization(sid: str):
+    session = _sessions.get(sid)
+    if not session:
+        return
+    survey = session_survey(sid)
+    with session["_lock"]:
+        if (session["finalization"] or {}).get("status") != "pending":
+            return
+        transcripts = _question_transcripts(session, survey)
+        through = _last_answer_seq(session)
+        fin = session["finalization"]
+        previous = {r["question_index"]: r for r in fin["results"] or []}
+        previous_through = fin["through"]
+    start = time.perf_counter()
+    try:
+        results = _extract_questions(sid, survey, transcripts, previous, previous_through)
+    except Exception as e:
+        logger.warning("End-of-session extraction failed for %s: %s", sid, e)
+        _finalize_stats["failed_attempts"] += 1
+        _append(sid, "finalize_failed", error=str(e)[:300])
+        fin = session["finalization"]
+        if fin["status"] == "pending":
+            # Back off so a rate limit or timeout does not burn every attempt at once.
+            delay = settings.session_finalize_retry_s * 2 ** (fin["attempts"] - 1)
+            retry = threading.Timer(delay, background_pool.submit, args=(_run_finalization, sid))
+            retry.daemon = True
+            retry.start()
+        return
+    _finalize_stats["completed"] += 1
+    _finalize_stats["extract_ms_total"] += (time.perf_counter() - start) * 1000
+    _append(sid, "extracted", results=results, through=through)
+    logger.info("Session %s finalized (%d questions)", sid, len(results))
+    # Entries logged while this run was in flight.
+    _maybe_finalize(sid)
+
+
+def resume_finalizations() -> int:
+    """Resubmit extraction for restored sessions whose finalization was interrupted."""
+    resumed = 0
+    for sid, session in list(_sessions.items()):
+        if (session["finalization"] or {}).get("status") == "pending":
+            background_pool.submit(_run_finalization, sid)
+            resumed += 1
+    _finalize_stats["resumed"] += resumed
+    if resumed:
+        logger.info("Resumed end-of-session extraction for %d session(s)", resumed)
+    return resumed
+
+
+def get_finalization(sid: str) -> dict[str, Any] | None:
+    """Status and, once done, per-question results; None if the session or its finalization does not exist."""
+    session = _sessions.get(sid)
+    if not session:
+        return None
+    with session["_lock"]:
+        fin = session["finalization"]
+        return dict(fin) if fin else None
+
+
+def get_finalize_stats() -> dict[str, Any]:
+    completed = _finalize_stats["completed"]
+    return {
+        "enabled": settings.session_finalize_enabled,
+        "inline_extraction": settings.inline_extraction_enabled,
+        **{k: v for k, v in _finalize_stats.items() if k != "extract_ms_total"},
+        "avg_extract_ms": round(_finalize_stats["extract_ms_total"] / completed, 1) if completed else 0.0,
+    }
@@ -0,0 +1,212 @@
+"""Session persistence: append-only change log plus a compact checkpoint for warm restarts.
+
+Only each session's event log and identity fields are written; derived state (entries,
+progress, coverage, pending follow-up) is rebuilt on load by replaying the events.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+from config import BACKEND_DIR, settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = Path(settings.session_snapshot_dir) if settings.session_snapshot_dir else BACKEND_DIR / "session_data"
+LOG_PATH = SNAPSHOT_DIR / "sessions.log"
+CHECKPOINT_PATH = SNAPSHOT_DIR / "sessions.checkpoint.json"
+LOCK_PATH = SNAPSHOT_DIR / "sessions.lock"
+
+# Rebuilt from the event log on load, so never written.
+DERIVED_FIELDS = ("entries", "completed_qs", "covered_ahead", "covered_evidence", "pending_follow_up", "finalization")
+
+_sessions: dict[str, dict[str, Any]] | None = None
+_dirty: set[str] = set()
+_dirty_lock = threading.Lock()
+_stop = threading.Event()
+_writer: threading.Thread | None = None
+_log_records = 0
+_lock_file = None
+_stats = {"flushes": 0, "records_written": 0, "checkpoints": 0, "last_flush_ms": 0.0, "restored": 0}
+
+
+def mark_dirty(sid: str):
+    """Queue a session for the next snapshot. Never blocks on I/O."""
+    if _writer is None:
+        return
+    with _dirty_lock:
+        _dirty.add(sid)
+
+
+def _serialize(session: dict[str, Any]) -> dict[str, Any]:
+    lock = session.get("_lock")
+    if lock is not None:
+        with lock:
+            return _copy_state(session)
+    return _copy_state(session)
+
+
+def _copy_state(session: dict[str, Any]) -> dict[str, Any]:
+    out: dict[str, Any] = {}
+    for k, v in list(session.items()):
+        if k.startswith("_") or k in DERIVED_FIELDS:
+            continue
+        if isinstance(v, list):
+            out[k] = list(v)
+        elif isinstance(v, dict):
+            out[k] = dict(v)
+        else:
+            out[k] = v
+    return out
+
+
+def load(into: dict[str, dict[str, Any]], rebuild: Callable[[dict[str, Any]], dict[str, Any]]) -> int:
+    """Restore sessions from the checkpoint plus the log on top of it; `rebuild` replays each event log."""
+    states: dict[str, dict[str, Any]] = {}
+    if CHECKPOINT_PATH.exists():
+        try:
+            states.update(json.loads(CHECKPOINT_PATH.read_text(encoding="utf-8")))
+        except Exception as e:
+            logger.warning("Session checkpoint unreadable, ignoring: %s", e)
+    global _log_records
+    if LOG_PATH.exists():
+        with LOG_PATH.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # torn final write from a crash
+                states[rec["sid"]] = rec["state"]
+                _log_records += 1
+
+    cutoff = time.time() - settings.session_snapshot_max_age_h * 3600
+    restored = 0
+    for sid, state in states.items():
+        if state.get("created_at", 0) < cutoff or sid in into:
+            continue
+        try:
+            into[sid] = rebuild(state)
+        except Exception as e:
+            logger.warning("Session %s could not be restored: %s", sid, e)
+            continue
+        restored += 1
+    _stats["restored"] = restored
+    return restored
+
+
+def _write_checkpoint():
+    global _log_records
+    snapshot = {sid: _serialize(s) for sid, s in list(_sessions.items())}
+    tmp = CHECKPOINT_PATH.with_suffix(".tmp")
+    tmp.write_text(json.dumps(snapshot, separators=(",", ":")), encoding="utf-8")
+    os.replace(tmp, CHECKPOINT_PATH)
+    LOG_PATH.write_text("", encoding="utf-8")
+    _log_records = 0
+    _stats["checkpoints"] += 1
+
+
+def flush():
+    """Append the current state of every dirty session to the log."""
+    global _log_records
+    with _dirty_lock:
+        sids = list(_dirty)
+        _dirty.clear()
+    if not sids or _sessions is None:
+        return
+    start = time.perf_counter()
+    lines = []
+    retry = []
+    for sid in sids:
+        session = _sessions.get(sid)
+        if session is None:
+            continue
+        try:
+            state = _serialize(session)
+            lines.append(json.dumps({"sid": sid, "state": state}, separators=(",", ":")))
+        except RuntimeError:
+            retry.append(sid)  # mutated mid-copy; pick it up next tick
+    if retry:
+        with _dirty_lock:
+            _dirty.update(retry)
+    if lines:
+        with LOG_PATH.open("a", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        _log_records += len(lines)
+        _stats["records_written"] += len(lines)
+    if _log_records >= settings.session_checkpoint_every:
+        _write_checkpoint()
+    _stats["flushes"] += 1
+    _stats["last_flush_ms"] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def _run():
+    while not _stop.wait(settings.session_snapshot_interval_s):
+        try:
+            flush()
+        except Exception:
+            logger.exception("Session snapshot failed")
+
+
+def acquire() -> bool:
+    """
+    Claim the snapshot directory for this process. Checkpoints rewrite the whole log, so two
+    processes sharing a directory would erase each other's sessions; False if another holds it.
+    """
+    global _lock_file
+    if _lock_file is not None:
+        return True
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    f = LOCK_PATH.open("a")
+    try:
+        import fcntl
+    except ImportError:
+        _lock_file = f  # no advisory locks on Windows; one process per directory is up to the deployment
+        return True
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _lock_file = f
+    return True
+
+
+def start(sessions: dict[str, dict[str, Any]]):
+    global _sessions, _writer
+    if _writer is not None:
+        return
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    _sessions = sessions
+    _writer = threading.Thread(target=_run, name="session-snapshot", daemon=True)
+    _writer.start()
+
+
+def stop():
+    """Final flush and checkpoint on shutdown."""
+    global _writer
+    if _writer is None:
+        return
+    _stop.set()
+    _writer.join(timeout=5)
+    _writer = None
+    try:
+        flush()
+        _write_checkpoint()
+    except Exception:
+        logger.exception("Final session snapshot failed")
+
+
+def get_stats() -> dict[str, Any]:
+    with _dirty_lock:
+        pending = len(_dirty)
+    return {
+        **_stats,
+        "enabled": settings.session_snapshot_enabled,
+        "active": _writer is not None,
+        "dir": str(SNAPSHOT_DIR),
+        "pending": pending,
+        "log_records": _log_records,
+    }
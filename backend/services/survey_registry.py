@@ -0,0 +1,251 @@
+"""Survey registry: question sets loaded from backend/surveys/*.json, each with its prompt artifacts precompiled."""
+import base64
+import hashlib
+import json
+import logging
+import re
+import threading
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from config import BACKEND_DIR, settings
+from prompts import (
+    CONTEXT_ANALYSIS_SYSTEM,
+    CONTEXT_ANALYSIS_SYSTEM_COMPACT,
+    CONTEXT_ANALYSIS_SYSTEM_COMPACT_FUSED,
+    CONTEXT_ANALYSIS_SYSTEM_FUSED,
+    MAX_FOLLOW_UPS_SLOT,
+    QUESTION_RULES_SLOT,
+    REALTIME_INSTRUCTIONS,
+)
+
+logger = logging.getLogger(__name__)
+
+SURVEYS_DIR = BACKEND_DIR / "surveys"
+AUDIO_DIR = BACKEND_DIR / "survey_audio"
+
+
+class UnknownSurvey(Exception):
+    """Raised when a request names a survey id that is not registered."""
+
+
+class SurveyQuestion(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    text: str
+    spoken_intro: str = ""
+    # Phrases that, in an answer to an earlier question, mean this question is already covered.
+    coverage_markers: list[str] = Field(default_factory=list)
+    # Question-specific analysis rule (rule 9 of the analysis prompt).
+    analysis_rule: str = ""
+    # Cap on follow-ups for this question once the participant has given a real answer.
+    max_clarifiers: int | None = None
+
+
+class SurveyDefinition(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    id: str
+    title: str = ""
+    max_follow_ups: int = 2
+    questions: list[SurveyQuestion] = Field(min_length=1)
+
+
+class Survey:
+    """A loaded survey plus everything derived from it that per-request code would otherwise rebuild."""
+
+    def __init__(self, definition: SurveyDefinition):
+        self.id = definition.id
+        self.title = definition.title
+        self.max_follow_ups = definition.max_follow_ups
+        self.questions = [q.text for q in definition.questions]
+        self.spoken_intros = [q.spoken_intro or q.text for q in definition.questions]
+        self.max_clarifiers = [q.max_clarifiers for q in definition.questions]
+
+        rules = [f"Q{i + 1}: {q.analysis_rule}" for i, q in enumerate(definition.questions) if q.analysis_rule]
+        question_rules = " ".join(rules) if rules else "There are no question-specific rules for this survey."
+        # Keyed by (compact, fused) output format.
+        self._analysis_systems = {
+            (False, False): _fill_slots(CONTEXT_ANALYSIS_SYSTEM, question_rules, self.max_follow_ups),
+            (True, False): _fill_slots(CONTEXT_ANALYSIS_SYSTEM_COMPACT, question_rules, self.max_follow_ups),
+            (False, True): _fill_slots(CONTEXT_ANALYSIS_SYSTEM_FUSED, question_rules, self.max_follow_ups),
+            (True, True): _fill_slots(CONTEXT_ANALYSIS_SYSTEM_COMPACT_FUSED, question_rules, self.max_follow_ups),
+        }
+
+        self.realtime_instructions = REALTIME_INSTRUCTIONS.format(
+            question_count=len(self.questions),
+            max_follow_ups=self.max_follow_ups,
+            questions_block="\n".join(f'{i + 1}. "{q}"' for i, q in enumerate(self.questions)),
+        )
+        self.realtime_tools = _realtime_tools(len(self.questions))
+
+        # Substring semantics match the original marker lists: any marker inside the normalized text.
+        self.coverage_matchers = [
+            (i, re.compile("|".join(re.escape(m) for m in q.coverage_markers)))
+            for i, q in enumerate(definition.questions)
+            if q.coverage_markers
+        ]
+
+        # Filled by warm_embeddings / warm_intro_audio; both need clients that are not ready at import.
+        self.question_embeddings: list[list[float]] | None = None
+        self.intro_audio: list[str | None] = [None] * len(self.questions)
+
+    def analysis_system(self, compact: bool = False, fused: bool = False) -> str:
+        return self._analysis_systems[(compact, fused)]
+
+    def question(self, q_idx: int) -> str:
+        return self.questions[q_idx] if 0 <= q_idx < len(self.questions) else ""
+
+    def infer_future_coverage(self, q_idx: int, normalized_text: str) -> list[int]:
+        """Later questions whose coverage markers appear in the (normalized) conversation text."""
+        return [i for i, pattern in self.coverage_matchers if i > q_idx and pattern.search(normalized_text)]
+
+    def describe(self) -> dict[str, Any]:
+        return {"id": self.id, "title": self.title, "question_count": len(self.questions)}
+
+
+def _fill_slots(template: str, question_rules: str, max_follow_ups: int) -> str:
+    return template.replace(QUESTION_RULES_SLOT, question_rules).replace(MAX_FOLLOW_UPS_SLOT, str(max_follow_ups))
+
+
+def _realtime_tools(question_count: int) -> list[dict[str, Any]]:
+    return [
+        {
+            "type": "function",
+            "name": "update_progress",
+            "description": "Call this EVERY TIME you finish getting a satisfactory answer for a main question. This updates the progress bar.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "question_index": {
+                        "type": "integer",
+                        "description": f"0-based index of the completed question (0 to {question_count - 1})",
+                    },
+                    "summary": {
+                        "type": "string",
+                        "description": "2-3 sentence summary of what the participant said",
+                    },
+                },
+                "required": ["question_index", "summary"],
+            },
+        },
+        {
+            "type": "function",
+            "name": "complete_checkin",
+            "description": f"Call this when ALL {question_count} questions have been answered and the check-in is complete.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "summaries": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": f"Summary for each of the {question_count} completed questions",
+                    },
+                },
+                "required": ["summaries"],
+            },
+        },
+    ]
+
+
+_surveys: dict[str, Survey] = {}
+_lock = threading.Lock()
+
+
+def load_surveys() -> int:
+    """Load and compile every survey file. Invalid files are logged and skipped."""
+    loaded: dict[str, Survey] = {}
+    for path in sorted(SURVEYS_DIR.glob("*.json")):
+        try:
+            definition = SurveyDefinition.model_validate(json.loads(path.read_text(encoding="utf-8")))
+        except Exception as e:
+            logger.warning("Skipping invalid survey file %s: %s", path.name, e)
+            continue
+        if definition.id in loaded:
+            logger.warning("Duplicate survey id %r in %s; keeping the first", definition.id, path.name)
+            continue
+        loaded[definition.id] = Survey(definition)
+    if settings.default_survey_id not in loaded:
+        logger.warning("Default survey %r not found in %s", settings.default_survey_id, SURVEYS_DIR)
+    with _lock:
+        _surveys.clear()
+        _surveys.update(loaded)
+    logger.info("Loaded %d survey(s): %s", len(loaded), ", ".join(loaded))
+    return len(loaded)
+
+
+def _ensure_loaded():
+    if not _surveys:
+        load_surveys()
+
+
+def get_survey(survey_id: str | None = None) -> Survey:
+    _ensure_loaded()
+    survey = _surveys.get(survey_id or settings.default_survey_id)
+    if survey is None:
+        raise UnknownSurvey(f"Unknown survey {survey_id or settings.default_survey_id!r}")
+    return survey
+
+
+def list_surveys() -> list[Survey]:
+    _ensure_loaded()
+    return list(_surveys.values())
+
+
+# ── Artifacts that need network clients (filled during warmup) ──────────
+
+def warm_embeddings(embed_fn) -> bool:
+    """Embed every survey's questions once so coverage queries skip an embedding round trip."""
+    if embed_fn is None:
+        return False
+    ok = True
+    for survey in list_surveys():
+        if survey.question_embeddings is not None:
+            continue
+        try:
+            vectors = embed_fn(list(survey.questions))
+            survey.question_embeddings = [[float(x) for x in vec] for vec in vectors]
+        except Exception as e:
+            logger.warning("Question embedding failed for survey %s: %s", survey.id, e)
+            ok = False
+    return ok
+
+
+def _audio_path(text: str):
+    key = f"{settings.openai_tts_model}|{settings.openai_tts_voice}|{text}"
+    return AUDIO_DIR / f"{hashlib.sha256(key.encode('utf-8')).hexdigest()[:24]}.mp3"
+
+
+def intro_audio(survey: Survey, q_idx: int, synthesize=None) -> str | None:
+    """Base64 mp3 of a spoken intro: memory, then disk cache, then `synthesize` (text -> base64) if given."""
+    if not 0 <= q_idx < len(survey.questions):
+        return None
+    cached = survey.intro_audio[q_idx]
+    if cached is not None:
+        return cached
+    path = _audio_path(survey.spoken_intros[q_idx])
+    if path.exists():
+        audio = base64.b64encode(path.read_bytes()).decode("utf-8")
+    elif synthesize is not None:
+        audio = synthesize(survey.spoken_intros[q_idx])
+        if audio:
+            AUDIO_DIR.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(base64.b64decode(audio))
+    else:
+        return None
+    survey.intro_audio[q_idx] = audio or None
+    return survey.intro_audio[q_idx]
+
+
+def warm_intro_audio(synthesize) -> int:
+    """Render (or load from disk) every survey's spoken intros; returns how many are ready."""
+    ready = 0
+    for survey in list_surveys():
+        for i in range(len(survey.questions)):
+            try:
+                if intro_audio(survey, i, synthesize):
+                    ready += 1
+            except Exception as e:
+                logger.warning("Intro audio failed for survey %s Q%d: %s", survey.id, i + 1, e)
+    return ready
@@ -0,0 +1,164 @@
+"""Per-call token usage ledger: prompt, cached and completion tokens plus latency by model and endpoint."""
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from config import settings
+
+# USD per 1M tokens: (input, cached input, output). Used only for estimates in summaries.
+MODEL_PRICES_PER_1M: dict[str, tuple[float, float, float]] = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+}
+
+_records: deque[dict[str, Any]] = deque(maxlen=settings.usage_ledger_max_records)
+_parse_failures: dict[str, int] = {}
+_lock = threading.Lock()
+
+
+def _price(model: str) -> tuple[float, float, float] | None:
+    if model in MODEL_PRICES_PER_1M:
+        return MODEL_PRICES_PER_1M[model]
+    # Dated snapshots, e.g. "gpt-4o-mini-2024-07-18": longest matching family wins.
+    families = sorted((m for m in MODEL_PRICES_PER_1M if model.startswith(m + "-")), key=len, reverse=True)
+    return MODEL_PRICES_PER_1M[families[0]] if families else None
+
+
+def _cost(rec: dict[str, Any]) -> float | None:
+    price = _price(rec["model"])
+    if price is None:
+        return None
+    uncached = rec["prompt_tokens"] - rec["cached_tokens"]
+    return (uncached * price[0] + rec["cached_tokens"] * price[1] + rec["completion_tokens"] * price[2]) / 1e6
+
+
+def record(
+    endpoint: str,
+    model: str,
+    prompt_tokens: int,
+    cached_tokens: int,
+    completion_tokens: int,
+    latency_s: float,
+    session_id: str | None = None,
+):
+    rec = {
+        "ts": time.time(),
+        "endpoint": endpoint,
+        "model": model,
+        "session_id": session_id,
+        "prompt_tokens": int(prompt_tokens or 0),
+        "cached_tokens": int(cached_tokens or 0),
+        "completion_tokens": int(completion_tokens or 0),
+        "latency_ms": round(latency_s * 1000, 1),
+    }
+    with _lock:
+        _records.append(rec)
+
+
+def record_openai(endpoint: str, resp: Any, latency_s: float, session_id: str | None = None):
+    """Record a chat.completions response from the OpenAI SDK."""
+    usage = getattr(resp, "usage", None)
+    details = getattr(usage, "prompt_tokens_details", None)
+    record(
+        endpoint,
+        getattr(resp, "model", "") or "",
+        getattr(usage, "prompt_tokens", 0),
+        getattr(details, "cached_tokens", 0) if details else 0,
+        getattr(usage, "completion_tokens", 0),
+        latency_s,
+        session_id,
+    )
+
+
+def record_langchain(endpoint: str, model: str, message: Any, latency_s: float, session_id: str | None = None):
+    """Record a LangChain AIMessage (invoke or aggregated stream) via its usage_metadata."""
+    usage = getattr(message, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    model = (getattr(message, "response_metadata", None) or {}).get("model_name") or model
+    record(
+        endpoint,
+        model,
+        usage.get("input_tokens", 0),
+        details.get("cache_read", 0),
+        usage.get("output_tokens", 0),
+        latency_s,
+        session_id,
+    )
+
+
+def record_parse_failure(endpoint: str):
+    """Count a response that failed schema validation, so dropped output is visible."""
+    with _lock:
+        _parse_failures[endpoint] = _parse_failures.get(endpoint, 0) + 1
+
+
+def query(
+    session_id: str | None = None,
+    endpoint: str | None = None,
+    model: str | None = None,
+    since: float | None = None,
+    limit: int = 100,
+) -> list[dict[str, Any]]:
+    with _lock:
+        records = list(_records)
+    out = [
+        r for r in records
+        if (session_id is None or r["session_id"] == session_id)
+        and (endpoint is None or r["endpoint"] == endpoint)
+        and (model is None or r["model"].startswith(model))
+        and (since is None or r["ts"] >= since)
+    ]
+    return out[-limit:] if limit > 0 else out
+
+
+def _aggregate(records: list[dict[str, Any]]) -> dict[str, Any]:
+    prompt = sum(r["prompt_tokens"] for r in records)
+    cached = sum(r["cached_tokens"] for r in records)
+    latencies = sorted(r["latency_ms"] for r in records)
+    costs = [_cost(r) for r in records]
+    known = [c for c in costs if c is not None]
+    return {
+        "calls": len(records),
+        "prompt_tokens": prompt,
+        "cached_tokens": cached,
+        "completion_tokens": sum(r["completion_tokens"] for r in records),
+        "cache_hit_rate": round(cached / prompt, 4) if prompt else 0.0,
+        "latency_ms_p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "latency_ms_p95": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] if latencies else 0.0,
+        "estimated_cost_usd": round(sum(known), 6) if known else None,
+    }
+
+
+def summary(group_by: tuple[str, ...] = ("model", "endpoint"), since: float | None = None) -> dict[str, Any]:
+    """Aggregates per group plus per-check-in averages over sessions seen in the ledger."""
+    records = query(since=since, limit=0)
+    groups: dict[str, list[dict[str, Any]]] = {}
+    for r in records:
+        groups.setdefault(" / ".join(str(r.get(k)) for k in group_by), []).append(r)
+
+    by_session: dict[str, list[dict[str, Any]]] = {}
+    for r in records:
+        if r["session_id"]:
+            by_session.setdefault(r["session_id"], []).append(r)
+    per_session = [_aggregate(rs) for rs in by_session.values()]
+    n = len(per_session)
+    costs = [s["estimated_cost_usd"] for s in per_session if s["estimated_cost_usd"] is not None]
+
+    with _lock:
+        parse_failures = dict(_parse_failures)
+    return {
+        "total": _aggregate(records),
+        "parse_failures": parse_failures,
+        "groups": {k: _aggregate(v) for k, v in sorted(groups.items())},
+        "per_checkin": {
+            "sessions": n,
+            "avg_calls": round(sum(s["calls"] for s in per_session) / n, 2) if n else 0.0,
+            "avg_prompt_tokens": round(sum(s["prompt_tokens"] for s in per_session) / n, 1) if n else 0.0,
+            "avg_completion_tokens": round(sum(s["completion_tokens"] for s in per_session) / n, 1) if n else 0.0,
+            "avg_estimated_cost_usd": round(sum(costs) / len(costs), 6) if costs else None,
+        },
+    }
@@ -0,0 +1,356 @@
+"""ChromaDB access: time-sharded session_responses collections, retention and compaction."""
+import logging
+import re
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+
+from config import BACKEND_DIR, settings
+from services.embeddings import collection_base_name, create_embedding_function
+
+logger = logging.getLogger(__name__)
+
+CHROMA_DIR = BACKEND_DIR / "chroma_data"
+_COMPACT_SUFFIX = "__compacting"
+_PAGE = 500
+
+_client = None
+_embed_fn = None
+_collections: dict[str, Any] = {}
+_lock = threading.RLock()
+# Held while a shard is being rebuilt so writes to it wait instead of being lost.
+_shard_locks: dict[str, threading.Lock] = {}
+
+_stats = {
+    "maintenance_runs": 0,
+    "docs_deleted": 0,
+    "shards_dropped": 0,
+    "compactions": 0,
+    "ts_backfilled": 0,
+    "last_run_ms": 0.0,
+    "last_run_at": None,
+}
+_deletes_since_compact: dict[str, int] = {}
+# Unsharded collections already checked for documents without `ts` in this process.
+_ts_checked: set[str] = set()
+_stop = threading.Event()
+_maintenance: threading.Thread | None = None
+
+
+def _init():
+    global _client, _embed_fn
+    if _client is not None:
+        return _client
+    with _lock:
+        if _client is not None:
+            return _client
+        try:
+            # Imported lazily: chromadb adds seconds to cold start and is only needed here.
+            import chromadb
+
+            embed_fn = create_embedding_function()
+            if settings.chroma_mode == "http":
+                # One pooled keep-alive connection set per process, shared by the vector-pool workers.
+                headers = {"Authorization": f"Bearer {settings.chroma_auth_token}"} if settings.chroma_auth_token else None
+                _client = chromadb.HttpClient(
+                    host=settings.chroma_host,
+                    port=settings.chroma_port,
+                    ssl=settings.chroma_ssl,
+                    headers=headers,
+                )
+                location = f"{'https' if settings.chroma_ssl else 'http'}://{settings.chroma_host}:{settings.chroma_port}"
+            else:
+                _client = chromadb.PersistentClient(path=str(CHROMA_DIR))
+                location = str(CHROMA_DIR)
+            _embed_fn = embed_fn
+            logger.info("ChromaDB ready at %s (embeddings: %s)", location, settings.embedding_backend)
+        except Exception as e:
+            logger.warning("ChromaDB init failed (non-critical): %s", e)
+    return _client
+
+
+def use_ephemeral():
+    """Swap in an in-memory client for scripts whose synthetic turns must not reach the configured store."""
+    global _client, _embed_fn
+    import chromadb
+
+    with _lock:
+        _embed_fn = create_embedding_function()
+        _client = chromadb.EphemeralClient()
+        _collections.clear()
+    logger.info("ChromaDB in-memory client (embeddings: %s)", settings.embedding_backend)
+
+
+def get_embedding_function():
+    _init()
+    return _embed_fn
+
+
+def shard_for(created_at: float | None) -> str:
+    """Collection name for a session created at `created_at` under the configured shard mode."""
+    base = collection_base_name()
+    mode = settings.vector_shard_mode
+    if mode == "none":
+        return base
+    dt = datetime.fromtimestamp(created_at or time.time(), tz=timezone.utc)
+    if mode == "day":
+        return f"{base}_{dt:%Y%m%d}"
+    if mode == "week":
+        year, week, _ = dt.isocalendar()
+        return f"{base}_{year}w{week:02d}"
+    return f"{base}_{dt:%Y%m}"
+
+
+def _shard_pattern() -> re.Pattern:
+    return re.compile(rf"^{re.escape(collection_base_name())}(?:_(\d{{8}}|\d{{6}}|\d{{4}}w\d{{2}}))?$")
+
+
+def _shard_end(name: str) -> datetime | None:
+    """End of a shard's time bucket, or None for the unsharded/legacy collection."""
+    match = _shard_pattern().match(name)
+    suffix = match.group(1) if match else None
+    if not suffix:
+        return None
+    try:
+        if len(suffix) == 8:
+            return datetime.strptime(suffix, "%Y%m%d").replace(tzinfo=timezone.utc) + timedelta(days=1)
+        if "w" in suffix:
+            year, week = suffix.split("w")
+            return datetime.fromisocalendar(int(year), int(week), 1).replace(tzinfo=timezone.utc) + timedelta(weeks=1)
+        if len(suffix) == 6:
+            start = datetime.strptime(suffix, "%Y%m").replace(tzinfo=timezone.utc)
+            return (start + timedelta(days=32)).replace(day=1)
+    except ValueError:
+        pass
+    return None
+
+
+def get_collection(name: str | None = None):
+    name = name or collection_base_name()
+    coll = _collections.get(name)
+    if coll is not None:
+        return coll
+    client = _init()
+    if client is None:
+        return None
+    with _lock:
+        coll = _collections.get(name)
+        if coll is None:
+            try:
+                coll = client.get_or_create_collection(name=name, embedding_function=_embed_fn)
+                _collections[name] = coll
+                _shard_locks.setdefault(name, threading.Lock())
+            except Exception as e:
+                logger.warning("ChromaDB collection %s unavailable: %s", name, e)
+    return coll
+
+
+def shard_lock(name: str) -> threading.Lock:
+    with _lock:
+        return _shard_locks.setdefault(name, threading.Lock())
+
+
+def list_shards() -> list[str]:
+    client = _init()
+    if client is None:
+        return []
+    pattern = _shard_pattern()
+    names = []
+    for c in client.list_collections():
+        name = c if isinstance(c, str) else c.name
+        if pattern.match(name):
+            names.append(name)
+    return sorted(names)
+
+
+# ── Retention and compaction ───────────────────────────────────────────
+
+def _backfill_ts(name: str) -> int:
+    """
+    Stamp documents stored before turns carried `ts` (the unsharded session_responses collection)
+    with the current time. Their real age is unknown, so retention counts from the first
+    maintenance run that sees them instead of never expiring them.
+    """
+    coll = get_collection(name)
+    if coll is None:
+        return 0
+    now = time.time()
+    stamped = 0
+    with shard_lock(name):
+        offset = 0
+        while True:
+            page = coll.get(include=["metadatas"], limit=_PAGE, offset=offset)
+            if not page["ids"]:
+                break
+            missing = [(i, m or {}) for i, m in zip(page["ids"], page["metadatas"]) if (m or {}).get("ts") is None]
+            if missing:
+                coll.update(ids=[i for i, _ in missing], metadatas=[{**m, "ts": now} for _, m in missing])
+                stamped += len(missing)
+            offset += _PAGE
+    _ts_checked.add(name)
+    if stamped:
+        _stats["ts_backfilled"] += stamped
+        logger.info("Backfilled ts on %d legacy document(s) in %s", stamped, name)
+    return stamped
+
+
+def _delete(name: str, where: dict[str, Any]) -> int | None:
+    """Delete matching documents; None if the collection is unavailable."""
+    coll = get_collection(name)
+    if coll is None:
+        return None
+    with shard_lock(name):
+        ids = coll.get(where=where, include=[])["ids"]
+        for i in range(0, len(ids), _PAGE):
+            coll.delete(ids=ids[i:i + _PAGE])
+    if ids:
+        _deletes_since_compact[name] = _deletes_since_compact.get(name, 0) + len(ids)
+        _stats["docs_deleted"] += len(ids)
+    return len(ids)
+
+
+def _drop_shard(name: str):
+    with _lock:
+        _client.delete_collection(name)
+        _collections.pop(name, None)
+        _deletes_since_compact.pop(name, None)
+    _stats["shards_dropped"] += 1
+    logger.info("Dropped expired vector shard %s", name)
+
+
+def compact(name: str) -> int:
+    """Rebuild a shard from its live rows (reusing stored embeddings) to shed deleted-entry overhead."""
+    coll = get_collection(name)
+    if coll is None:
+        return 0
+    tmp_name = name + _COMPACT_SUFFIX
+    with shard_lock(name):
+        try:
+            _client.delete_collection(tmp_name)
+        except Exception:
+            pass
+        tmp = _client.create_collection(name=tmp_name, embedding_function=_embed_fn)
+        copied = 0
+        offset = 0
+        while True:
+            page = coll.get(include=["embeddings", "documents", "metadatas"], limit=_PAGE, offset=offset)
+            if not page["ids"]:
+                break
+            tmp.add(
+                ids=page["ids"],
+                embeddings=page["embeddings"],
+                documents=page["documents"],
+                metadatas=page["metadatas"],
+            )
+            copied += len(page["ids"])
+            offset += _PAGE
+        with _lock:
+            _client.delete_collection(name)
+            tmp.modify(name=name)
+            _collections[name] = _client.get_collection(name=name, embedding_function=_embed_fn)
+            _deletes_since_compact[name] = 0
+    _stats["compactions"] += 1
+    logger.info("Compacted vector shard %s (%d live docs)", name, copied)
+    return copied
+
+
+def run_maintenance(
+    completed_sessions: Callable[[], list[tuple[str, str]]] | None = None,
+    released: Callable[[str], None] | None = None,
+):
+    """
+    Apply retention policies, drop expired shards and compact shards with many deletions.
+    `released(sid)` is called once a completed session's vectors are actually deleted.
+    """
+    if _init() is None:
+        return
+    start = time.perf_counter()
+    now = datetime.now(tz=timezone.utc)
+
+    if settings.vector_retention_days > 0:
+        cutoff = now - timedelta(days=settings.vector_retention_days)
+        for name in list_shards():
+            end = _shard_end(name)
+            if end is not None and end <= cutoff:
+                _drop_shard(name)
+                continue
+            if end is None and name not in _ts_checked:
+                _backfill_ts(name)
+            _delete(name, {"ts": {"$lt": cutoff.timestamp()}})
+            # The pre-sharding collection gets no new writes once sharded; drop it when it empties.
+            if end is None and settings.vector_shard_mode != "none" and name != shard_for(None):
+                coll = get_collection(name)
+                if coll is not None and coll.count() == 0:
+                    _drop_shard(name)
+
+    if not settings.vector_retain_completed_sessions and completed_sessions is not None:
+        for sid, shard in completed_sessions():
+            try:
+                deleted = _delete(shard, {"session_id": sid})
+            except Exception as e:
+                logger.warning("Releasing vectors of session %s failed, will retry: %s", sid, e)
+                continue
+            if deleted is not None and released is not None:
+                released(sid)
+
+    # Shard locks are per process, so a rebuild could drop writes from other workers sharing a server.
+    compactable = list(_deletes_since_compact.items()) if settings.chroma_mode != "http" else []
+    for name, deleted in compactable:
+        if deleted >= settings.vector_compact_min_deletes and name in list_shards():
+            compact(name)
+
+    _stats["maintenance_runs"] += 1
+    _stats["last_run_ms"] = round((time.perf_counter() - start) * 1000, 1)
+    _stats["last_run_at"] = time.time()
+
+
+def start_maintenance(
+    submit: Callable[[Callable], Any],
+    completed_sessions: Callable[[], list[tuple[str, str]]],
+    released: Callable[[str], None] | None = None,
+):
+    """Periodically hand run_maintenance to `submit` (the background vector-pool queue)."""
+    global _maintenance
+    if _maintenance is not None or settings.vector_maintenance_interval_s <= 0:
+        return
+    if not settings.vector_maintenance_leader:
+        logger.info("Vector maintenance left to the leader worker")
+        return
+
+    def loop():
+        while not _stop.wait(settings.vector_maintenance_interval_s):
+            submit(lambda: _safe_maintenance(completed_sessions, released))
+
+    _maintenance = threading.Thread(target=loop, name="vector-maintenance", daemon=True)
+    _maintenance.start()
+
+
+def _safe_maintenance(completed_sessions, released=None):
+    try:
+        run_maintenance(completed_sessions, released)
+    except Exception:
+        logger.exception("Vector store maintenance failed")
+
+
+def stop_maintenance():
+    _stop.set()
+
+
+def get_stats() -> dict[str, Any]:
+    shards = {}
+    for name, coll in list(_collections.items()):
+        try:
+            shards[name] = coll.count()
+        except Exception:
+            shards[name] = None
+    return {
+        **_stats,
+        "mode": settings.chroma_mode,
+        "maintenance_leader": settings.vector_maintenance_leader,
+        "embedding_backend": settings.embedding_backend,
+        "shard_mode": settings.vector_shard_mode,
+        "retention_days": settings.vector_retention_days,
+        "open_shards": shards,
+        "pending_deletes": dict(_deletes_since_compact),
+    }
@@ -0,0 +1,100 @@
+"""Background warmup of heavy dependencies, with a startup timing report."""
+import asyncio
+import importlib
+import logging
+import time
+from typing import Any, Awaitable, Callable
+
+from config import settings
+from services.executors import PRIORITY_INTERACTIVE, background_pool, vector_pool
+
+logger = logging.getLogger(__name__)
+
+_report: dict[str, Any] = {
+    "ready": False,
+    "started_at": None,
+    "finished_at": None,
+    "phases_ms": {},
+    "errors": {},
+}
+
+
+def record_phase(name: str, seconds: float):
+    _report["phases_ms"][name] = round(seconds * 1000, 1)
+
+
+def _timed(name: str, fn: Callable[[], Any]) -> Any:
+    start = time.perf_counter()
+    try:
+        return fn()
+    except Exception as e:
+        _report["errors"][name] = str(e)[:200]
+        logger.warning("Warmup phase %s failed: %s", name, e)
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+async def _timed_async(name: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+    start = time.perf_counter()
+    try:
+        return await fn()
+    except Exception as e:
+        _report["errors"][name] = str(e)[:200]
+        logger.warning("Warmup phase %s failed: %s", name, e)
+    finally:
+        record_phase(name, time.perf_counter() - start)
+
+
+async def warm_up():
+    """Import heavy modules and open clients off the request path."""
+    from routers.realtime import warm_http_client
+    from services import exemplars, survey_registry
+    from services.openai_service import text_to_speech, warm_client
+    from services.session_manager import warm_llm_client, warm_vector_store
+
+    _report["started_at"] = time.time()
+    start = time.perf_counter()
+
+    await asyncio.gather(
+        asyncio.to_thread(_timed, "import_chromadb", lambda: importlib.import_module("chromadb")),
+        asyncio.to_thread(_timed, "import_langchain", lambda: importlib.import_module("langchain_openai")),
+    )
+
+    phases = [
+        asyncio.wrap_future(vector_pool.submit(
+            _timed, "vector_store", warm_vector_store, priority=PRIORITY_INTERACTIVE,
+        )),
+    ]
+    key = settings.openai_api_key.strip().strip('"').strip("'")
+    if key:
+        phases += [
+            asyncio.to_thread(_timed, "llm_client", warm_llm_client),
+            asyncio.to_thread(_timed, "openai_client", warm_client),
+            _timed_async("realtime_http_client", warm_http_client),
+        ]
+        if settings.extraction_exemplars_enabled:
+            phases.append(asyncio.to_thread(_timed, "exemplar_index", exemplars.load))
+        if settings.survey_intro_audio_enabled:
+            phases.append(asyncio.wrap_future(background_pool.submit(
+                _timed, "survey_intro_audio", lambda: survey_registry.warm_intro_audio(text_to_speech),
+            )))
+    results = await asyncio.gather(*phases)
+    if not results[0]:
+        _report["errors"].setdefault("vector_store", "embeddings unavailable")
+
+    record_phase("warmup_total", time.perf_counter() - start)
+    _report["finished_at"] = time.time()
+    _report["ready"] = True
+    logger.info("Warmup finished: %s", _report["phases_ms"])
+    if _report["errors"]:
+        logger.warning("Warmup errors: %s", _report["errors"])
+
+
+def get_startup_report() -> dict[str, Any]:
+    return {
+        "ready": _report["ready"],
+        "started_at": _report["started_at"],
+        "finished_at": _report["finished_at"],
+        "phases_ms": dict(_report["phases_ms"]),
+        "errors": dict(_report["errors"]),
+    }
@@ -19,7 +19,7 @@ import {
   RotateCcw
 } from "lucide-react";
 import RealtimeVoice from "./realtime-voice";
-import { createSession, textSubmit, checkCovered, playBase64Audio } from "@/lib/api";
+import { createSession, textSubmit, checkCovered, playBase64Audio, completeCheckIn, getResults } from "@/lib/api";
 
 // Types
 interface Question {
@@ -126,6 +126,26 @@ export function FeedbackForm({
     return () => { cancelled = true };
   }, []);
 
+  // End-of-session extraction: make sure it is queued, then attach its output to the results.
+  useEffect(() => {
+    if (!completed || !sessionId) return;
+    let cancelled = false;
+    (async () => {
+      await completeCheckIn(sessionId);
+      for (let attempt = 0; attempt < 30 && !cancelled; attempt++) {
+        const res = await getResults(sessionId).catch(() => null);
+        if (res && res.status !== 'pending') {
+          if (cancelled || !mountedRef.current || res.status !== 'done' || !res.results) return;
+          const byIndex = new Map(res.results.map((r: any) => [r.question_index, r]));
+          setResults(prev => prev.map(r => ({ ...r, structured: byIndex.get(r.questionIndex) ?? r.structured })));
+          return;
+        }
+        await new Promise(resolve => setTimeout(resolve, 2000));
+      }
+    })();
+    return () => { cancelled = true };
+  }, [completed, sessionId]);
+
   const progress = questions.length
     ? (completedQs.size / questions.length) * 100
     : 0;
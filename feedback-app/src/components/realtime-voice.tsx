@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useEffect, useRef, useCallback } from 'react'
-import { getRealtimeToken, syncVoiceTranscript } from '@/lib/api'
+import { getRealtimeToken, getSessionChannel } from '@/lib/api'
 import { Mic, Square, Volume2, Activity, Loader2, Lock } from 'lucide-react'
 import { Button } from '@/components/ui/button'
 import { motion, AnimatePresence } from 'framer-motion'
@@ -131,7 +131,7 @@ export default function RealtimeVoice({
       const transcript = event.transcript || ''
       if (transcript && p.onUserTranscript) {
         p.onUserTranscript(transcript)
-        syncVoiceTranscript(p.sessionId, p.questionIndex, transcript, '')
+        getSessionChannel(p.sessionId).sendTurn(p.questionIndex, 'user', transcript)
       }
       return
     }
@@ -149,7 +149,7 @@ export default function RealtimeVoice({
       if (mountedRef.current) setAiText('')
       if (fullText && p.onAITranscript) {
         p.onAITranscript(fullText)
-        syncVoiceTranscript(p.sessionId, p.questionIndex, '', fullText)
+        getSessionChannel(p.sessionId).sendTurn(p.questionIndex, 'ai', fullText)
       }
       return
     }
@@ -175,6 +175,7 @@ export default function RealtimeVoice({
       if (fnName === 'update_progress') {
         const qi = args.question_index ?? -1
         if (qi > highestCompletedQRef.current) highestCompletedQRef.current = qi
+        if (qi >= 0) getSessionChannel(p.sessionId).markProgress(qi)
         if (p.onQuestionDone) p.onQuestionDone(qi, args.summary || '')
         sendFunctionOutput(callId, JSON.stringify({ ok: true }))
         return
@@ -182,6 +183,7 @@ export default function RealtimeVoice({
 
       if (fnName === 'complete_checkin') {
         sendFunctionOutput(callId, JSON.stringify({ ok: true }))
+        getSessionChannel(p.sessionId).complete()
         if (p.onCheckInComplete) p.onCheckInComplete(args.summaries || [])
         setTimeout(() => {
           if (mountedRef.current) {
@@ -14,16 +14,31 @@ async function fetchWithFallback(path: string, init?: RequestInit) {
   }
 }
 
-export async function createSession() {
-  const r = await fetchWithFallback('/api/checkin/session', { method: 'POST' })
+// One key per logical submission; fetchWithFallback re-sends the same init, so
+// a network-level retry replays the original result instead of re-running it.
+function idempotencyKey() {
+  if (typeof crypto !== 'undefined' && typeof crypto.randomUUID === 'function') return crypto.randomUUID()
+  return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`
+}
+
+export async function createSession(surveyId?: string) {
+  const r = await fetchWithFallback('/api/checkin/session', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(surveyId ? { survey_id: surveyId } : {}),
+  })
   if (!r.ok) throw new Error('Failed to create session')
-  return r.json()
+  const data = await r.json()
+  channels.forEach(ch => ch.close())
+  channels.clear()
+  if (data.session_id) getSessionChannel(data.session_id)
+  return data
 }
 
 export async function textSubmit(sessionId: string, questionIndex: number, response: string, followUpCount: number) {
   const r = await fetchWithFallback('/api/checkin/text-submit', {
     method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
+    headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey() },
     body: JSON.stringify({
       session_id: sessionId,
       question_index: questionIndex,
@@ -41,6 +56,9 @@ export async function textSubmit(sessionId: string, questionIndex: number, respo
 }
 
 export async function checkCovered(sessionId: string, questionIndex: number) {
+  // Served from the pushed session state when the live channel is up.
+  const pushed = channels.get(sessionId)?.state?.coverage?.[questionIndex]
+  if (pushed) return { covered: pushed.covered === true, evidence: (pushed.evidence || '').toString() }
   try {
     const r = await fetchWithFallback(`/api/checkin/check-covered/${sessionId}/${questionIndex}`)
     if (!r.ok) return { covered: false, evidence: '' }
@@ -54,6 +72,22 @@ export async function checkCovered(sessionId: string, questionIndex: number) {
   }
 }
 
+// Queue end-of-session extraction; a no-op if the server already started it.
+export async function completeCheckIn(sessionId: string) {
+  try {
+    await fetchWithFallback(`/api/checkin/complete/${sessionId}`, { method: 'POST' })
+  } catch (_) {
+    /* the server also finalizes once every question is answered */
+  }
+}
+
+// End-of-session extraction; status is 'pending' until the background job finishes.
+export async function getResults(sessionId: string) {
+  const r = await fetchWithFallback(`/api/checkin/results/${sessionId}`)
+  if (!r.ok) return null
+  return r.json() as Promise<{ status: 'pending' | 'done' | 'failed'; results: any[] | null; error: string | null }>
+}
+
 export async function getRealtimeToken(sessionId: string, questionIndex: number) {
   const r = await fetchWithFallback('/api/realtime/token', {
     method: 'POST',
@@ -73,7 +107,7 @@ export async function syncVoiceTranscript(sessionId: string, questionIndex: numb
   try {
     await fetchWithFallback('/api/realtime/sync', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers: { 'Content-Type': 'application/json', 'Idempotency-Key': idempotencyKey() },
       body: JSON.stringify({
         session_id: sessionId,
         question_index: questionIndex,
@@ -86,6 +120,146 @@ export async function syncVoiceTranscript(sessionId: string, questionIndex: numb
   }
 }
 
+/* ── Live session channel ─────────────────────────────────
+   One WebSocket per session: transcript turns are batched up and sent together,
+   and the server pushes coverage / pending follow-up / progress as they change.
+   Falls back to POST /api/realtime/sync while the socket is not open. A batch sent over the
+   socket is kept until the server acks it and resent with the same id after a reconnect,
+   so the server applies it once even if the first copy did land. */
+
+type CoverageState = { question_index: number; covered: boolean; evidence: string }
+type PendingFollowUp = { question_idx: number; text: string; ts: number }
+export type SessionState = {
+  coverage: CoverageState[]
+  pending_follow_up: PendingFollowUp | null
+  completed_questions: number[]
+  turns: number
+  seq: number
+  finalization: 'pending' | 'done' | 'failed' | null
+}
+type QueuedTurn = { question_index: number; role: 'user' | 'ai'; text: string }
+
+const TURN_BATCH_MS = 50
+const channels = new Map<string, SessionChannel>()
+
+class SessionChannel {
+  state: SessionState | null = null
+  private ws: WebSocket | null = null
+  private queue: QueuedTurn[] = []
+  // Sent batches awaiting their ack, by id, in send order.
+  private unacked = new Map<string, string>()
+  private flushTimer: ReturnType<typeof setTimeout> | null = null
+  private retryTimer: ReturnType<typeof setTimeout> | null = null
+  private closed = false
+  private listeners = new Set<(state: SessionState) => void>()
+
+  constructor(private sessionId: string) {
+    this.connect()
+  }
+
+  private connect() {
+    if (this.closed || typeof WebSocket === 'undefined') return
+    const ws = new WebSocket(`${API.replace(/^http/, 'ws')}/api/realtime/ws/${this.sessionId}`)
+    ws.onopen = () => {
+      this.unacked.forEach(batch => ws.send(batch))
+      this.flush()
+    }
+    ws.onmessage = (ev) => {
+      let msg: any
+      try { msg = JSON.parse(ev.data) } catch { return }
+      if (msg.type === 'ack') {
+        this.unacked.delete(msg.id)
+      } else if (msg.type === 'error' && msg.id) {
+        // Rejected as malformed: resending the same batch cannot succeed.
+        this.unacked.delete(msg.id)
+        console.warn('Session channel rejected turns:', msg.detail)
+      } else if (msg.type === 'state') {
+        const { type: _type, ...state } = msg
+        this.state = state as SessionState
+        this.listeners.forEach(fn => fn(this.state as SessionState))
+      }
+    }
+    ws.onclose = (ev) => {
+      this.ws = null
+      this.state = null
+      // 4404: unknown session, so reconnecting cannot help.
+      if (!this.closed && ev.code !== 4404) this.retryTimer = setTimeout(() => this.connect(), 1000)
+    }
+    this.ws = ws
+  }
+
+  onState(fn: (state: SessionState) => void) {
+    this.listeners.add(fn)
+    return () => { this.listeners.delete(fn) }
+  }
+
+  sendTurn(questionIndex: number, role: 'user' | 'ai', text: string) {
+    if (!text) return
+    this.queue.push({ question_index: questionIndex, role, text })
+    if (!this.flushTimer) this.flushTimer = setTimeout(() => this.flush(), TURN_BATCH_MS)
+  }
+
+  // Progress on the last question can start end-of-session extraction, so queued turns go first.
+  markProgress(questionIndex: number) {
+    const flushed = this.flush()
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify({ type: 'progress', question_index: questionIndex }))
+      return
+    }
+    flushed
+      .then(() => fetchWithFallback('/api/realtime/progress', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ session_id: this.sessionId, question_index: questionIndex }),
+      }))
+      .catch(() => {})
+  }
+
+  // Check-in finished: send any queued turns first so the end-of-session extraction sees them.
+  complete() {
+    const flushed = this.flush()
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      this.ws.send(JSON.stringify({ type: 'complete' }))
+      return
+    }
+    flushed.then(() => completeCheckIn(this.sessionId))
+  }
+
+  // Resolves once REST fallback syncs have landed (immediately when sent over the socket).
+  private async flush() {
+    if (this.flushTimer) { clearTimeout(this.flushTimer); this.flushTimer = null }
+    const turns = this.queue.splice(0)
+    if (!turns.length) return
+    if (this.ws && this.ws.readyState === WebSocket.OPEN) {
+      const id = idempotencyKey()
+      const batch = JSON.stringify({ type: 'turns', id, question_index: turns[0].question_index, turns })
+      this.unacked.set(id, batch)
+      this.ws.send(batch)
+      return
+    }
+    for (const t of turns) {
+      await syncVoiceTranscript(this.sessionId, t.question_index, t.role === 'user' ? t.text : '', t.role === 'ai' ? t.text : '')
+    }
+  }
+
+  close() {
+    this.closed = true
+    this.flush()
+    if (this.retryTimer) clearTimeout(this.retryTimer)
+    if (this.ws) { try { this.ws.close() } catch (_) {} }
+    this.ws = null
+  }
+}
+
+export function getSessionChannel(sessionId: string) {
+  let ch = channels.get(sessionId)
+  if (!ch) {
+    ch = new SessionChannel(sessionId)
+    channels.set(sessionId, ch)
+  }
+  return ch
+}
+
 export function playBase64Audio(base64Mp3: string) {
   return new Promise<void>((resolve) => {
     if (!base64Mp3) return resolve()